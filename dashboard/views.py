@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, F, Q
+from django.db.models import DecimalField, Sum, Count, F, Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
 
@@ -23,17 +24,17 @@ def dashboard_view(request):
     # Stock statistics
     low_stock_products = Product.objects.filter(
         is_active=True,
-        stock_quantity__lte=F('minimum_stock')
+        stock_status__in=Product.LOW_STOCK_STATUSES
     ).count()
     
     out_of_stock_products = Product.objects.filter(
         is_active=True,
-        stock_quantity=0
+        stock_status='out'
     ).count()
     
-    # Calculate total inventory value
+    # Calculate total inventory value (ledger FIFO valuation, shelf price until revalued)
     total_value = Product.objects.filter(is_active=True).aggregate(
-        total=Sum(F('stock_quantity') * F('unit_price'))
+        total=Sum(Coalesce('valuation__fifo_value', F('stock_quantity') * F('unit_price'), output_field=DecimalField()))
     )['total'] or 0
     
     # Recent stock movements
@@ -44,7 +45,7 @@ def dashboard_view(request):
     # Low stock alerts for sidebar
     low_stock_alerts = Product.objects.filter(
         is_active=True,
-        stock_quantity__lte=F('minimum_stock')
+        stock_status__in=Product.LOW_STOCK_STATUSES
     ).order_by('stock_quantity')[:5]
     
     # Recent notifications
@@ -82,9 +83,10 @@ def dashboard_view(request):
 def analytics_view(request):
     """Analytics and reports view"""
     
-    from products.models import Product, Category
+    from products.models import Category
     from suppliers.models import Supplier
     from inventory.models import StockMovement
+    from inventory.snapshots import daily_trend
     
     # Time-based analytics
     today = timezone.now().date()
@@ -104,23 +106,13 @@ def analytics_view(request):
         product_count=Count('products', filter=Q(products__is_active=True))
     ).order_by('-product_count')
     
-    # Low stock trends
-    low_stock_trend = []
-    for i in range(7):
-        date = today - timedelta(days=i)
-        count = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lte=F('minimum_stock')
-        ).count()
-        low_stock_trend.append({
-            'date': date,
-            'count': count
-        })
+    # Low stock and stock value per day, from the daily snapshots
+    low_stock_trend = daily_trend(days=7)
     
     context = {
         'movements_data': movements_data,
         'category_data': category_data,
-        'low_stock_trend': reversed(low_stock_trend),
+        'low_stock_trend': low_stock_trend,
         'total_movements_week': StockMovement.objects.filter(
             created_at__date__gte=week_ago
         ).count(),
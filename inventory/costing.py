@@ -0,0 +1,266 @@
+"""
+Weighted-average and FIFO stock valuation computed from the movement ledger
+"""
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, F, Max
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+
+# Movements younger than this are left for the next run, so rows still
+# being committed with an earlier created_at are never skipped
+SETTLE_DELAY = timedelta(seconds=60)
+
+# Products per IN (...) lookup; keeps statements under SQLite's parameter limit
+LOOKUP_BATCH = 900
+
+# Ledger rows fetched per round trip; only NumPy columns are kept between fetches
+FETCH_SIZE = 20000
+
+# Unit costs and prices have two decimal places, so money is carried as
+# integer cents and only turned into Decimal when rows are written
+CENTS = 100
+
+
+def _cents(field):
+    """A two-place decimal column as whole cents, computed in SQL"""
+    return Cast(Round(F(field) * CENTS), BigIntegerField())
+
+
+def _to_cents(value):
+    """Decimal, or a number stored in fifo_layers, as whole cents"""
+    return int((Decimal(str(value)) * CENTS).to_integral_value())
+
+
+def _from_cents(cents, places='0.01'):
+    return (Decimal(int(cents)) / CENTS).quantize(Decimal(places))
+
+
+def load_movements(start, end):
+    """
+    Ledger rows with start < created_at <= end as NumPy columns, grouped by product.
+
+    Rows are read in (created_at, id) index order through a plain cursor,
+    FETCH_SIZE at a time and skipping per-row model conversion, and grouped
+    with a stable sort, so each product's movements stay in time order
+    without the database sorting millions of rows by product. Returns
+    (product_ids, starts, previous_stock, new_stock, unit_cost, has_cost,
+    inbound): one product id per group, the row where each group starts,
+    and per row the stock before and after, the recorded unit cost in
+    cents, whether one was recorded and whether the movement type is an
+    inbound one.
+    """
+    import numpy as np
+    from products.models import Product
+    from .models import StockMovement
+    from .services import StockLedgerService
+
+    movements = StockMovement.objects.filter(created_at__lte=end)
+    if start is not None:
+        movements = movements.filter(created_at__gt=start)
+    sql, params = movements.order_by('created_at', 'id').values_list(
+        'product_id', 'movement_type', 'previous_stock', 'new_stock', _cents('unit_cost'),
+    ).query.sql_with_params()
+
+    index = {}
+    inbound_types = StockLedgerService.INBOUND_TYPES
+    chunks = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            product_ids, movement_types, previous_stock, new_stock, unit_cost = zip(*rows)
+            chunks.append((
+                np.fromiter((index.setdefault(product_id, len(index)) for product_id in product_ids), np.int64, len(rows)),
+                np.array(previous_stock, dtype=np.int64),
+                np.array(new_stock, dtype=np.int64),
+                np.fromiter((cost or 0 for cost in unit_cost), np.int64, len(rows)),
+                np.fromiter((cost is not None for cost in unit_cost), bool, len(rows)),
+                np.fromiter((movement_type in inbound_types for movement_type in movement_types), bool, len(rows)),
+            ))
+    if chunks:
+        columns = [np.concatenate(parts) for parts in zip(*chunks)]
+    else:
+        columns = [np.zeros(0, dtype=dtype) for dtype in (np.int64,) * 4 + (bool, bool)]
+    codes, previous_stock, new_stock, unit_cost, has_cost, inbound = columns
+
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.zeros(0, dtype=np.int64)
+    raw_ids = list(index)
+    to_python = Product._meta.pk.to_python
+    return (
+        [to_python(raw_ids[code]) for code in codes[starts]],
+        starts,
+        previous_stock[order],
+        new_stock[order],
+        unit_cost[order],
+        has_cost[order],
+        inbound[order],
+    )
+
+
+def value_stock(quantity, codes, layer_quantity, layer_cost, price):
+    """
+    Vectorized FIFO valuation of many products at once, in integer cents.
+
+    ``quantity`` and ``price`` hold one entry per product; the layer arrays
+    hold every receipt still to be considered (carried-over layers and new
+    receipts) with ``codes`` naming the product of each, ordered oldest
+    first within a product. FIFO keeps the newest receipts that cover the
+    quantity on hand; stock no receipt explains is valued at the product
+    price. Returns (fifo_value, kept) where ``kept`` is the quantity left
+    on each layer.
+    """
+    import numpy as np
+
+    products = len(quantity)
+    on_hand = np.maximum(quantity, 0).astype(np.int64)
+
+    order = np.argsort(codes, kind='stable')
+    codes, layer_quantity, layer_cost = codes[order], layer_quantity[order], layer_cost[order]
+    running = np.cumsum(layer_quantity)
+    group_end = np.zeros(products, dtype=np.int64)
+    if len(codes):
+        last = np.r_[codes[1:] != codes[:-1], True]
+        group_end[codes[last]] = running[last]
+    newer = group_end[codes] - running
+    kept = np.clip(on_hand[codes] - newer, 0, layer_quantity)
+
+    covered = np.zeros(products, dtype=np.int64)
+    np.add.at(covered, codes, kept)
+    fifo_value = np.zeros(products, dtype=np.int64)
+    np.add.at(fifo_value, codes, kept * layer_cost)
+    fifo_value += (on_hand - covered) * price
+
+    kept_layers = np.empty(len(order), dtype=np.int64)
+    kept_layers[order] = kept
+    return fifo_value, kept_layers
+
+
+def revalue(full=False, batch_size=2000):
+    """
+    Bring ProductValuation up to date with the ledger and return the rows written.
+
+    An incremental run reads only movements after the newest watermark and
+    starts each touched product from its stored quantity, receipt totals
+    and FIFO layers. A full run (or the first one) replays the whole ledger;
+    a product's opening stock (before its first movement, or all of it when
+    it has none) becomes one receipt at its current price. Only inbound
+    movement types are receipts; adjustments and reversals that raise
+    stock change the quantity on hand but not the cost basis.
+    """
+    import numpy as np
+    from products.models import Product
+    from .models import ProductValuation, StockMovement
+
+    watermark = timezone.now() - SETTLE_DELAY
+    start = None if full else ProductValuation.objects.aggregate(start=Max('watermark'))['start']
+    if start is not None and start >= watermark:
+        return 0
+
+    product_ids, starts, previous_stock, new_stock, unit_cost, has_cost, inbound = load_movements(start, watermark)
+    groups = len(product_ids)
+    rows = len(new_stock)
+    codes = np.repeat(np.arange(groups), np.diff(np.r_[starts, rows]).astype(np.int64))
+    ends = np.r_[starts[1:], rows].astype(np.int64) - 1
+    quantity = new_stock[ends] if groups else np.zeros(0, dtype=np.int64)
+    opening = previous_stock[starts]
+
+    prices = {}
+    stored = {}
+    price_column = _cents('unit_price')
+    if start is None:
+        # Full runs value every product, those without movements from their current stock;
+        # products first moved after the watermark are left for the next run
+        moved = set(product_ids) | set(
+            StockMovement.objects.filter(created_at__gt=watermark).values_list('product_id', flat=True).distinct()
+        )
+        idle = []
+        for product_id, stock_quantity, unit_price in Product.objects.values_list('id', 'stock_quantity', price_column):
+            prices[product_id] = unit_price
+            if product_id not in moved:
+                idle.append((product_id, stock_quantity))
+        product_ids = product_ids + [product_id for product_id, _ in idle]
+        idle_stock = np.array([stock_quantity for _, stock_quantity in idle], dtype=np.int64)
+        quantity = np.r_[quantity, idle_stock]
+        opening = np.r_[opening, idle_stock]
+    else:
+        for offset in range(0, groups, LOOKUP_BATCH):
+            chunk = product_ids[offset:offset + LOOKUP_BATCH]
+            prices.update(Product.objects.filter(pk__in=chunk).values_list('id', price_column))
+            stored.update((row.product_id, row) for row in ProductValuation.objects.filter(product_id__in=chunk))
+
+    price = np.array([prices[product_id] for product_id in product_ids], dtype=np.int64)
+    cost = np.where(has_cost, unit_cost, price[codes])
+
+    products = len(product_ids)
+    received_quantity = np.zeros(products, dtype=np.int64)
+    received_cost = np.zeros(products, dtype=np.int64)
+    layer_codes, layer_quantity, layer_cost = [], [], []
+    for code, product_id in enumerate(product_ids):
+        row = stored.get(product_id)
+        if row is not None:
+            received_quantity[code] = row.received_quantity
+            received_cost[code] = _to_cents(row.received_cost)
+            for layer_qty, layer_unit_cost in row.fifo_layers:
+                layer_codes.append(code)
+                layer_quantity.append(layer_qty)
+                layer_cost.append(_to_cents(layer_unit_cost))
+        elif opening[code] > 0:
+            received_quantity[code] = opening[code]
+            received_cost[code] = opening[code] * price[code]
+            layer_codes.append(code)
+            layer_quantity.append(opening[code])
+            layer_cost.append(price[code])
+
+    receipts = inbound & (new_stock > previous_stock)
+    added = (new_stock - previous_stock)[receipts]
+    np.add.at(received_quantity, codes[receipts], added)
+    np.add.at(received_cost, codes[receipts], added * cost[receipts])
+
+    all_codes = np.r_[np.array(layer_codes, dtype=np.int64), codes[receipts]]
+    all_quantity = np.r_[np.array(layer_quantity, dtype=np.int64), added]
+    all_cost = np.r_[np.array(layer_cost, dtype=np.int64), cost[receipts]]
+    fifo_value, kept = value_stock(quantity, all_codes, all_quantity, all_cost, price)
+
+    layers = [[] for _ in range(products)]
+    for index in np.flatnonzero(kept > 0):
+        layers[all_codes[index]].append([int(kept[index]), str(_from_cents(all_cost[index]))])
+
+    valuations = []
+    for code, product_id in enumerate(product_ids):
+        on_hand = max(int(quantity[code]), 0)
+        if received_quantity[code] > 0:
+            # Exact fraction of the receipt totals; rounded once per column
+            average_cost = Decimal(int(received_cost[code])) / CENTS / int(received_quantity[code])
+        else:
+            average_cost = Decimal(int(price[code])) / CENTS
+        valuations.append(ProductValuation(
+            product_id=product_id,
+            quantity=int(quantity[code]),
+            received_quantity=int(received_quantity[code]),
+            received_cost=_from_cents(received_cost[code], '0.0001'),
+            average_cost=average_cost.quantize(Decimal('0.0001')),
+            average_value=(average_cost * on_hand).quantize(Decimal('0.01')),
+            fifo_layers=layers[code],
+            fifo_value=_from_cents(fifo_value[code]),
+            watermark=watermark,
+        ))
+    with transaction.atomic():
+        ProductValuation.objects.bulk_create(
+            valuations,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[
+                'quantity', 'received_quantity', 'received_cost', 'average_cost', 'average_value',
+                'fifo_layers', 'fifo_value', 'watermark', 'updated_at',
+            ],
+        )
+        # Products without new movements advance too, so the next run starts here
+        ProductValuation.objects.filter(watermark__lt=watermark).update(watermark=watermark)
+    return len(valuations)
@@ -0,0 +1,194 @@
+"""
+Constant-memory CSV / JSON Lines exports of products, movements and valuation
+"""
+from django.db.models import DecimalField, F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+import csv
+import json
+import uuid
+
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# dataset -> list of (column name, ORM path)
+EXPORT_COLUMNS = {
+    'products': [
+        ('sku', 'sku'),
+        ('name', 'name'),
+        ('category', 'category__name'),
+        ('barcode', 'barcode'),
+        ('brand', 'brand'),
+        ('unit', 'unit'),
+        ('stock_quantity', 'stock_quantity'),
+        ('minimum_stock', 'minimum_stock'),
+        ('reorder_level', 'reorder_level'),
+        ('stock_status', 'stock_status'),
+        ('unit_price', 'unit_price'),
+        ('cost_price', 'cost_price'),
+        ('updated_at', 'updated_at'),
+    ],
+    'movements': [
+        ('created_at', 'created_at'),
+        ('sku', 'product__sku'),
+        ('product', 'product__name'),
+        ('movement_type', 'movement_type'),
+        ('quantity', 'quantity'),
+        ('previous_stock', 'previous_stock'),
+        ('new_stock', 'new_stock'),
+        ('unit_cost', 'unit_cost'),
+        ('reference_number', 'reference_number'),
+        ('created_by', 'created_by__username'),
+        ('notes', 'notes'),
+    ],
+    'valuation': [
+        ('sku', 'sku'),
+        ('name', 'name'),
+        ('category', 'category__name'),
+        ('stock_quantity', 'stock_quantity'),
+        ('unit_price', 'unit_price'),
+        ('total_value', 'total_value'),
+    ],
+}
+
+
+# Computed decimal columns and their precision. SQLite returns expressions
+# as floats, so these are quantized in Python before encoding
+EXPORT_QUANTIZE = {
+    'valuation': {'total_value': Decimal('0.01')},
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown dataset/format or invalid filters"""
+
+
+def parse_filters(date_from=None, date_to=None, category=None):
+    """Validate raw filter values (strings or None) into SQL-ready values"""
+    from products.models import Category
+
+    filters = {}
+    for key, value in (('date_from', date_from), ('date_to', date_to)):
+        if value:
+            if isinstance(value, str):
+                try:
+                    value = date.fromisoformat(value)
+                except ValueError:
+                    raise ExportError(f'{key} must be a date in YYYY-MM-DD format')
+            filters[key] = value
+
+    if category:
+        try:
+            filters['category'] = uuid.UUID(str(category))
+        except ValueError:
+            category_id = Category.objects.filter(name__iexact=category).values_list('id', flat=True).first()
+            if category_id is None:
+                raise ExportError(f'Unknown category "{category}"')
+            filters['category'] = category_id
+    return filters
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(dataset, filters):
+    """Build the values_list queryset for a dataset with every filter applied in SQL"""
+    from products.models import Product
+    from .models import StockMovement
+
+    if dataset not in EXPORT_COLUMNS:
+        raise ExportError(f'Unknown export "{dataset}". Choose from: {", ".join(EXPORT_COLUMNS)}')
+    paths = [path for _, path in EXPORT_COLUMNS[dataset]]
+
+    if dataset == 'movements':
+        queryset = StockMovement.objects.all()
+        # Half-open datetime range so the (created_at, id) index serves the scan
+        if 'date_from' in filters:
+            queryset = queryset.filter(created_at__gte=_day_start(filters['date_from']))
+        if 'date_to' in filters:
+            queryset = queryset.filter(created_at__lt=_day_start(filters['date_to'] + timedelta(days=1)))
+        if 'category' in filters:
+            queryset = queryset.filter(product__category_id=filters['category'])
+        return queryset.order_by('created_at', 'id').values_list(*paths)
+
+    queryset = Product.objects.filter(is_active=True)
+    if 'category' in filters:
+        queryset = queryset.filter(category_id=filters['category'])
+    if dataset == 'valuation':
+        queryset = queryset.annotate(total_value=Coalesce(
+            'valuation__fifo_value', F('stock_quantity') * F('unit_price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ))
+    return queryset.order_by('name', 'id').values_list(*paths)
+
+
+def _plain(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _quantized(row, quantize):
+    row = list(row)
+    for index, exponent in quantize:
+        if row[index] is not None:
+            row[index] = Decimal(row[index]).quantize(exponent)
+    return row
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f'Cannot serialise {type(value).__name__}')
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(dataset, export_format='csv', filters=None, chunk_size=2000, stats=None):
+    """
+    Yield the export as text chunks of about ``chunk_size`` rows.
+
+    Rows come from a chunked iterator over values_list() tuples, so no
+    model instances are built and only one chunk is held in memory. Pass
+    a dict as ``stats`` to have the running row count stored in it.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'Unknown format "{export_format}". Choose from: {", ".join(EXPORT_FORMATS)}')
+
+    columns = [name for name, _ in EXPORT_COLUMNS.get(dataset, [])]
+    rows = export_queryset(dataset, filters or {}).iterator(chunk_size=chunk_size)
+    quantize = [(columns.index(name), exponent) for name, exponent in EXPORT_QUANTIZE.get(dataset, {}).items()]
+    if quantize:
+        rows = (_quantized(row, quantize) for row in rows)
+
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        encode = lambda row: writer.writerow([_plain(value) for value in row])
+    else:
+        encode = lambda row: json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+
+    if stats is None:
+        stats = {}
+    stats['rows'] = 0
+    buffer = []
+    for row in rows:
+        stats['rows'] += 1
+        buffer.append(encode(row))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,126 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from inventory.models import StockAlert
+from inventory.services import StockAlertService
+from notifications.models import Notification
+from products.models import Category, Product
+import random
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = 'Benchmark set-based stock alert evaluation against the per-alert trigger_alert() loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alerts',
+            type=int,
+            default=100000,
+            help='Temporary alerts to create for the run, five per product (default: 100000)',
+        )
+        parser.add_argument(
+            '--legacy-sample',
+            type=int,
+            default=2000,
+            help='Alerts to run through trigger_alert() to project the legacy cost (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back, so seeded rows never persist
+        with transaction.atomic():
+            self.seed_alerts(options['alerts'])
+            total = StockAlert.objects.filter(is_active=True).count()
+
+            sample = list(StockAlert.objects.filter(is_active=True).order_by('id')[:options['legacy_sample']])
+            legacy_hits = 0
+            with transaction.atomic():
+                start_time = time.perf_counter()
+                for alert in sample:
+                    if alert.trigger_alert() is not None:
+                        legacy_hits += 1
+                legacy_seconds = time.perf_counter() - start_time
+                transaction.set_rollback(True)
+            per_alert_ms = legacy_seconds * 1000 / max(len(sample), 1)
+
+            notifications_before = Notification.objects.count()
+            start_time = time.perf_counter()
+            counts = StockAlertService.evaluate()
+            engine_seconds = time.perf_counter() - start_time
+            created = Notification.objects.count() - notifications_before
+
+            # A second pass finds every fired alert inside its daily cooldown
+            start_time = time.perf_counter()
+            StockAlertService.evaluate()
+            repeat_seconds = time.perf_counter() - start_time
+
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 STOCK ALERT BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Active alerts: {total}')
+            self.stdout.write(
+                f'trigger_alert() loop: {per_alert_ms:.2f} ms/alert over {len(sample)} alerts '
+                f'({legacy_hits} fired), projected {per_alert_ms * total / 1000:.1f} seconds for all'
+            )
+            self.stdout.write(
+                f'Set-based engine: {engine_seconds:.2f} seconds for all, '
+                f'{sum(counts.values())} fired, {created} notifications'
+            )
+            for alert_type, count in counts.items():
+                self.stdout.write(f'   {alert_type}: {count}')
+            self.stdout.write(f'Repeat run (cooldown): {repeat_seconds:.2f} seconds')
+            self.stdout.write(
+                f'Speedup: {per_alert_ms * total / 1000 / max(engine_seconds, 1e-9):.1f}x'
+            )
+
+            transaction.set_rollback(True)
+
+    def seed_alerts(self, count):
+        products_needed = -(-count // len(StockAlert.ALERT_TYPES))
+        self.stdout.write(f'🌱 Seeding {products_needed} temporary products and {count} alerts...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        today = timezone.localdate()
+        thresholds = {
+            'low_stock': (5, 10, 15),
+            'out_of_stock': (0,),
+            'expiry_soon': (3, 7, 14, 30),
+            'expired': (0,),
+            'reorder_point': (20, 25, 40),
+        }
+
+        batch_size = 5000
+        created = 0
+        for offset in range(0, products_needed, batch_size):
+            products = []
+            for i in range(min(batch_size, products_needed - offset)):
+                has_expiry = random.random() < 0.3
+                products.append(Product(
+                    id=uuid.uuid4(),
+                    name=f'Alert benchmark {offset + i}',
+                    sku=f'AL-{uuid.uuid4().hex[:12].upper()}',
+                    category=category,
+                    unit_price=1,
+                    stock_quantity=random.choice((0, random.randint(1, 30), random.randint(31, 1000))),
+                    has_expiry=has_expiry,
+                    expiry_date=today + timedelta(days=random.randint(-10, 120)) if has_expiry else None,
+                ))
+            Product.objects.bulk_create(products)
+
+            alerts = []
+            for product in products:
+                for alert_type, _ in StockAlert.ALERT_TYPES:
+                    if created + len(alerts) >= count:
+                        break
+                    alerts.append(StockAlert(
+                        product=product,
+                        alert_type=alert_type,
+                        threshold_value=random.choice(thresholds[alert_type]),
+                        email_notifications=False,
+                    ))
+            StockAlert.objects.bulk_create(alerts)
+            created += len(alerts)
@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F, Sum
+from products.models import Category, Product
+from inventory.models import StockMovement
+from inventory.services import StockLedgerService
+import threading
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent writers on the stock ledger and check for lost updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Number of concurrent writers (default: 8)',
+        )
+        parser.add_argument(
+            '--adjustments',
+            type=int,
+            default=200,
+            help='Adjustments per writer (default: 200)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark product and its movements afterwards',
+        )
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        per_thread = options['adjustments']
+        total = threads * per_thread
+
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark_stock_ledger', 'is_active': False}
+        )
+        product = Product.objects.create(
+            name='Stock ledger benchmark',
+            sku=f'BENCH-{uuid.uuid4().hex[:12]}',
+            category=category,
+            unit_price=1,
+            stock_quantity=0,
+            is_active=False,
+        )
+
+        self.stdout.write(
+            f'🏁 {threads} writers x {per_thread} adjustments on {product.sku} '
+            f'({connection.vendor})'
+        )
+
+        errors = []
+
+        def writer(index):
+            from django.db import connection as thread_connection
+            try:
+                for i in range(per_thread):
+                    # Mix inbound and outbound movements; the net effect is +1 each
+                    StockLedgerService.record_movement(product.pk, 'in', 2, notes=f'bench {index}/{i}')
+                    StockLedgerService.record_movement(product.pk, 'out', 1, notes=f'bench {index}/{i}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                thread_connection.close()
+
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        start_time = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        duration = time.perf_counter() - start_time
+
+        product.refresh_from_db()
+        movements = StockMovement.objects.filter(product=product)
+        movement_count = movements.count()
+
+        # A lost update shows up as a recorded delta that never reached the product
+        recorded_delta = movements.aggregate(
+            total=Sum(F('new_stock') - F('previous_stock'))
+        )['total'] or 0
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 STOCK LEDGER BENCHMARK'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Movements written: {movement_count} (expected {2 * total})')
+        self.stdout.write(f'Final stock: {product.stock_quantity} (expected {total})')
+        self.stdout.write(f'Sum of recorded deltas: {recorded_delta}')
+        self.stdout.write(f'Writer errors: {len(errors)}')
+        self.stdout.write(f'⏱️  Duration: {duration:.2f} seconds')
+        self.stdout.write(f'⚡ Throughput: {movement_count / duration:.0f} adjustments/second')
+
+        if errors:
+            self.stdout.write(self.style.ERROR(f'First error: {errors[0]}'))
+
+        if product.stock_quantity == total == recorded_delta and not errors:
+            self.stdout.write(self.style.SUCCESS('\n✅ No lost updates'))
+        else:
+            self.stdout.write(self.style.ERROR('\n❌ Lost updates detected'))
+
+        if not options['keep']:
+            product.delete()
@@ -0,0 +1,124 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from inventory.models import InventoryTransaction
+from inventory.services import StockLedgerService
+from products.models import Category, Product
+import random
+import time
+import uuid
+
+
+class QueryCounter:
+    """Execute wrapper counting statements (the debug query log is capped)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cancelling a large inventory transaction against the per-movement reversal loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=2000,
+            help='Movement lines on the temporary transaction (default: 2000)',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=500,
+            help='Distinct products the lines are spread over (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back, so seeded rows never persist
+        with transaction.atomic():
+            order, initial_stock = self.seed_transaction(options['lines'], options['products'])
+            lines = order.movements.count()
+
+            with transaction.atomic():
+                legacy_queries = QueryCounter()
+                with connection.execute_wrapper(legacy_queries):
+                    start_time = time.perf_counter()
+                    for movement in order.movements.all():
+                        StockLedgerService.apply_delta(
+                            product=movement.product_id,
+                            delta=-movement.quantity_change,
+                            movement_type='adjustment',
+                            user=movement.created_by,
+                            notes=f"Reversal of transaction {order.reference_number}",
+                            reference_number=f"REVERSE-{movement.reference_number}",
+                        )
+                    legacy_seconds = time.perf_counter() - start_time
+                transaction.set_rollback(True)
+
+            engine_queries = QueryCounter()
+            with connection.execute_wrapper(engine_queries):
+                start_time = time.perf_counter()
+                order.cancel_transaction()
+                engine_seconds = time.perf_counter() - start_time
+
+            final_stock = dict(Product.objects.filter(pk__in=initial_stock).values_list('id', 'stock_quantity'))
+            mismatched = sum(1 for pk, quantity in initial_stock.items() if final_stock[pk] != quantity)
+
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 TRANSACTION CANCEL BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Lines: {lines} over {len(initial_stock)} products')
+            self.stdout.write(
+                f'Per-movement loop: {legacy_seconds:.2f} seconds, {legacy_queries.count} queries'
+            )
+            self.stdout.write(
+                f'Bulk reversal: {engine_seconds:.2f} seconds, {engine_queries.count} queries'
+            )
+            self.stdout.write(f'Speedup: {legacy_seconds / max(engine_seconds, 1e-9):.1f}x')
+            if mismatched:
+                self.stdout.write(self.style.ERROR(f'❌ {mismatched} products not restored to their starting stock'))
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ Every product restored to its starting stock'))
+
+            transaction.set_rollback(True)
+
+    def seed_transaction(self, line_count, product_count):
+        self.stdout.write(f'🌱 Seeding {product_count} temporary products and a {line_count}-line transaction...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        products = [
+            Product(
+                id=uuid.uuid4(),
+                name=f'Cancel benchmark {i}',
+                sku=f'TC-{uuid.uuid4().hex[:12].upper()}',
+                category=category,
+                unit_price=1,
+                stock_quantity=random.randint(0, 500),
+                is_active=False,
+            )
+            for i in range(product_count)
+        ]
+        Product.objects.bulk_create(products)
+        initial_stock = {product.pk: product.stock_quantity for product in products}
+
+        order = InventoryTransaction.objects.create(
+            transaction_type='purchase',
+            reference_number=f'BENCH-{uuid.uuid4().hex[:12].upper()}',
+            status='completed',
+        )
+        # Several lines per product, mostly receipts with some issues
+        lines = [
+            {
+                'sku': random.choice(products).sku,
+                'movement_type': 'in' if random.random() < 0.8 else 'out',
+                'quantity': random.randint(1, 50),
+            }
+            for _ in range(line_count)
+        ]
+        StockLedgerService.bulk_record_movements(lines, reference_number=order.reference_number)
+        return order, initial_stock
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.services import AlertEvaluationService, StockAlertService
+import time
+
+
+class Command(BaseCommand):
+    help = 'Evaluate every active stock alert in bulk and create notifications for the ones that fire'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Evaluate only the products large writes queued for evaluation',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='With --pending, keep polling the queue instead of exiting once it is empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between polls with --watch (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            self.process_pending(options['watch'], options['interval'])
+            return
+
+        self.stdout.write(self.style.SUCCESS('🔍 Evaluating stock alerts...'))
+
+        start_time = time.perf_counter()
+        counts = StockAlertService.evaluate()
+        elapsed = time.perf_counter() - start_time
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 STOCK ALERT SUMMARY'))
+        self.stdout.write('='*50)
+        for alert_type, count in counts.items():
+            self.stdout.write(f'{alert_type}: {count}')
+        self.stdout.write(f'Total notifications: {sum(counts.values())}')
+        self.stdout.write(f'Time: {elapsed:.2f} seconds')
+
+    def process_pending(self, watch, interval):
+        self.stdout.write(self.style.SUCCESS('🔍 Evaluating queued products...'))
+
+        try:
+            while True:
+                products, created = AlertEvaluationService.process_pending()
+                if products or not watch:
+                    stamp = timezone.localtime().strftime('%H:%M:%S')
+                    self.stdout.write(f'[{stamp}] 📦 Evaluated {products} products, {created} notifications')
+                if not watch:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Alert evaluation worker stopped'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.exports import EXPORT_COLUMNS, EXPORT_FORMATS, ExportError, iter_export, parse_filters
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = 'Stream products, stock movements or valuation to CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORT_COLUMNS), help='What to export')
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Output format (default: csv)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write (default: standard output)',
+        )
+        parser.add_argument('--date-from', help='Only movements on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Only movements on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--category', help='Category id or name')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched and written per chunk (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                category=options['category'],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        output = options['output']
+        stream = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+        start_time = time.perf_counter()
+        stats = {}
+        try:
+            for chunk in iter_export(options['dataset'], options['format'], filters, options['chunk_size'], stats):
+                stream.write(chunk)
+        finally:
+            if output:
+                stream.close()
+
+        if output:
+            rows = stats['rows']
+            elapsed = time.perf_counter() - start_time
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Exported {rows} {options["dataset"]} rows to {output} '
+                f'in {elapsed:.2f} seconds ({rows / max(elapsed, 1e-9):.0f} rows/sec)'
+            ))
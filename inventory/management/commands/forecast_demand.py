@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from inventory.forecasting import HISTORY_DAYS, run_forecast
+import time
+
+
+class Command(BaseCommand):
+    help = 'Forecast daily demand, reorder quantities and stockout dates for every active product'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'📈 Forecasting demand from the last {HISTORY_DAYS} days of outbound movements...')
+        start_time = time.perf_counter()
+        result = run_forecast()
+        elapsed = time.perf_counter() - start_time
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 FORECAST SUMMARY'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Products forecast: {result["products"]}')
+        self.stdout.write(f'Forecasts changed: {result["written"]}')
+        self.stdout.write(f'Time: {elapsed:.2f} seconds')
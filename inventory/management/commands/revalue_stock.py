@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from inventory.costing import revalue
+import time
+
+
+class Command(BaseCommand):
+    help = 'Update weighted-average and FIFO stock valuations from new ledger movements'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Replay the whole movement ledger instead of only movements since the last run',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'💰 Revaluing stock ({"full ledger" if options["full"] else "new movements"})...')
+        start_time = time.perf_counter()
+        written = revalue(full=options['full'])
+        elapsed = time.perf_counter() - start_time
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 VALUATION SUMMARY'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Products revalued: {written}')
+        self.stdout.write(f'Time: {elapsed:.2f} seconds')
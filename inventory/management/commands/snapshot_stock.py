@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from inventory.snapshots import last_complete_day, missing_days, take_snapshots
+import time
+
+
+class Command(BaseCommand):
+    help = 'Record end-of-day stock snapshots (run nightly; catches up on missed days)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Snapshot a single past day (YYYY-MM-DD) instead of the missing ones',
+        )
+        parser.add_argument(
+            '--backfill',
+            type=int,
+            default=0,
+            help='Rebuild the last N days from the movement ledger',
+        )
+        parser.add_argument(
+            '--max-catch-up',
+            type=int,
+            default=31,
+            help='Most missing days to fill in one run (default: 31)',
+        )
+
+    def handle(self, *args, **options):
+        yesterday = last_complete_day()
+        if options['date']:
+            days = [options['date']]
+        elif options['backfill']:
+            days = [yesterday - timedelta(days=offset) for offset in range(options['backfill'])]
+        else:
+            days = missing_days(limit=options['max_catch_up'])
+
+        if not days:
+            self.stdout.write(self.style.SUCCESS('✅ Snapshots are up to date'))
+            return
+
+        self.stdout.write(f'📸 Snapshotting {len(days)} day(s): {min(days)} to {max(days)}...')
+        start_time = time.perf_counter()
+        try:
+            written = take_snapshots(days)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start_time
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 SNAPSHOT SUMMARY'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Days: {len(days)}')
+        self.stdout.write(f'Rows written: {written}')
+        self.stdout.write(f'Time: {elapsed:.2f} seconds')
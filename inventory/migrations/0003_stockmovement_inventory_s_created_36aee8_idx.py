@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_auto_20250810_2302'),
+        ('products', '0003_remove_product_products_pr_name_9ff0a3_idx_and_more'),
+        ('suppliers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at', 'id'], name='inventory_s_created_36aee8_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stockmovement_inventory_s_created_36aee8_idx'),
+        ('products', '0005_product_products_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('status', models.CharField(max_length=10)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'status'], name='inventory_s_date_d37db8_idx')],
+                'unique_together': {('product', 'date')},
+            },
+        ),
+    ]
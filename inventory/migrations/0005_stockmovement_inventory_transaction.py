@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_movements(apps, schema_editor):
+    """Point existing movements at the transaction whose reference number they carry"""
+    InventoryTransaction = apps.get_model('inventory', 'InventoryTransaction')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.filter(reference_number__isnull=False).exclude(reference_number='').update(
+        inventory_transaction=models.Subquery(
+            InventoryTransaction.objects.filter(
+                reference_number=models.OuterRef('reference_number')
+            ).values('id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='inventory_transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='inventory.inventorytransaction'),
+        ),
+        migrations.RunPython(link_movements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stockmovement_inventory_transaction'),
+        ('products', '0005_product_products_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductValuation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='products.product')),
+                ('quantity', models.IntegerField(default=0)),
+                ('received_quantity', models.BigIntegerField(default=0)),
+                ('received_cost', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('average_cost', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('average_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fifo_layers', models.JSONField(default=list)),
+                ('fifo_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('watermark', models.DateTimeField(db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_productvaluation'),
+        ('products', '0005_product_products_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='products.product')),
+                ('moving_average', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('smoothed_demand', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('lead_time_days', models.IntegerField(default=0)),
+                ('reorder_quantity', models.IntegerField(default=0)),
+                ('stockout_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stockout_date'], name='inventory_d_stockou_63ad60_idx')],
+            },
+        ),
+    ]
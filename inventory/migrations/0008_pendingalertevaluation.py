@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_demandforecast'),
+        ('products', '0006_productsearchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAlertEvaluation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='products.product')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from django.conf import settings
+from django.db import OperationalError, models, transaction
+from django.db.models.functions import Abs, Coalesce
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from decimal import Decimal
+import time
 import uuid
 
 
@@ -25,6 +31,9 @@ class StockMovement(models.Model):
     new_stock = models.IntegerField()
     unit_cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     reference_number = models.CharField(max_length=100, blank=True, null=True)
+    inventory_transaction = models.ForeignKey(
+        'InventoryTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='movements'
+    )
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -34,6 +43,7 @@ class StockMovement(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['product', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
             models.Index(fields=['movement_type', 'created_at']),
             models.Index(fields=['created_by', 'created_at']),
         ]
@@ -108,21 +118,34 @@ class InventoryTransaction(models.Model):
     def __str__(self):
         return f"{self.get_transaction_type_display()} - {self.reference_number}"
 
+    @staticmethod
+    def line_total():
+        """SQL value of one movement line: its unit cost (else the product price) times quantity"""
+        return models.ExpressionWrapper(
+            Coalesce('unit_cost', 'product__unit_price') * Abs('quantity'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    @classmethod
+    def with_totals(cls, queryset=None):
+        """Annotate line_count and lines_total in the same query as the transactions"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        line_total = Coalesce('movements__unit_cost', 'movements__product__unit_price') * Abs('movements__quantity')
+        return queryset.annotate(
+            line_count=models.Count('movements'),
+            lines_total=models.Sum(line_total, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+
     def get_stock_movements(self):
         """Get all stock movements related to this transaction"""
-        return StockMovement.objects.filter(reference_number=self.reference_number)
+        return self.movements.all()
 
     def calculate_total(self):
-        """Calculate total amount from stock movements"""
-        total = 0
-        for movement in self.get_stock_movements():
-            if movement.unit_cost:
-                total += abs(movement.quantity) * movement.unit_cost
-            else:
-                total += abs(movement.quantity) * movement.product.unit_price
-        
-        self.total_amount = total
-        return total
+        """Calculate total and tax amounts from stock movements in one aggregate"""
+        total = self.movements.aggregate(total=models.Sum(self.line_total()))['total'] or Decimal('0')
+        self.total_amount = total.quantize(Decimal('0.01'))
+        self.tax_amount = (total * Decimal(str(settings.TAX_RATE))).quantize(Decimal('0.01'))
+        return self.total_amount
 
     def complete_transaction(self, user=None):
         """Mark transaction as completed"""
@@ -132,29 +155,47 @@ class InventoryTransaction(models.Model):
             self.created_by = user
         self.save()
 
-    def cancel_transaction(self):
-        """Cancel transaction and reverse stock movements"""
-        if self.status == 'completed':
-            # Reverse all stock movements
-            for movement in self.get_stock_movements():
-                # Create reverse movement
-                StockMovement.objects.create(
-                    product=movement.product,
-                    movement_type='adjustment',
-                    quantity=abs(movement.quantity_change),
-                    previous_stock=movement.product.stock_quantity,
-                    new_stock=movement.product.stock_quantity - movement.quantity_change,
-                    reference_number=f"REVERSE-{movement.reference_number}",
-                    notes=f"Reversal of transaction {self.reference_number}",
-                    created_by=movement.created_by
-                )
-                
-                # Update product stock
-                movement.product.stock_quantity -= movement.quantity_change
-                movement.product.save()
-        
+    def cancel_transaction(self, user=None):
+        """
+        Cancel the transaction, reversing its stock movements if it was completed.
+
+        Movements are netted per product in SQL from the stock changes they
+        actually applied, and the reversal is written by the stock ledger as
+        one locked, set-based update with one reversal movement per product.
+        The status flips with a conditional UPDATE, so of two concurrent
+        cancels only the one that moved the row off 'completed' reverses
+        stock. The whole transaction is retried like the stock ledger's
+        writes when the database reports a lock. Returns False if the
+        transaction was already cancelled.
+        """
+        from .services import StockLedgerService
+
+        rows = InventoryTransaction.objects.filter(pk=self.pk)
+        for attempt in range(StockLedgerService.MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    reverse = rows.filter(status='completed').update(status='cancelled') == 1
+                    cancelled = reverse or rows.exclude(status='cancelled').update(status='cancelled') == 1
+
+                    if reverse:
+                        net_changes = self.movements.order_by().values('product_id').annotate(
+                            net=models.Sum(models.F('new_stock') - models.F('previous_stock'))
+                        ).values_list('product_id', 'net')
+                        StockLedgerService.bulk_apply_deltas(
+                            {product_id: -net for product_id, net in net_changes},
+                            user=user,
+                            notes=f"Reversal of transaction {self.reference_number}",
+                            reference_number=f"REVERSE-{self.reference_number}",
+                        )
+                break
+            except OperationalError:
+                # SQLite reports write contention as "database is locked"
+                if attempt == StockLedgerService.MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(min(0.005 * 2 ** attempt, 0.5))
+
         self.status = 'cancelled'
-        self.save()
+        return cancelled
 
 
 class StockAlert(models.Model):
@@ -236,4 +277,91 @@ class StockAlert(models.Model):
         self.last_triggered = timezone.now()
         self.save()
         
-        return notification
\ No newline at end of file
+        return notification
+
+
+class StockSnapshot(models.Model):
+    """End-of-day stock level of one product, written by the snapshot_stock job"""
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    quantity = models.IntegerField()
+    value = models.DecimalField(max_digits=14, decimal_places=2)
+    status = models.CharField(max_length=10)
+
+    class Meta:
+        unique_together = ['product', 'date']
+        indexes = [
+            models.Index(fields=['date', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.date}: {self.quantity}"
+
+
+class ProductValuation(models.Model):
+    """Ledger-based cost valuation of one product's stock, maintained by the revalue_stock job"""
+    product = models.OneToOneField(
+        'products.Product', on_delete=models.CASCADE, primary_key=True, related_name='valuation'
+    )
+    quantity = models.IntegerField(default=0)
+    # Running receipt totals (opening stock included) behind the weighted-average cost
+    received_quantity = models.BigIntegerField(default=0)
+    received_cost = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    average_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    average_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Unconsumed receipts as [quantity, unit cost] pairs, oldest first
+    fifo_layers = models.JSONField(default=list)
+    fifo_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Movements created up to this instant are included
+    watermark = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} @ {self.average_cost}"
+
+
+class DemandForecast(models.Model):
+    """Daily demand forecast and reorder suggestion for one product, written by the forecast_demand job"""
+    product = models.OneToOneField(
+        'products.Product', on_delete=models.CASCADE, primary_key=True, related_name='forecast'
+    )
+    # Units per day from outbound movements
+    moving_average = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    smoothed_demand = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    lead_time_days = models.IntegerField(default=0)
+    reorder_quantity = models.IntegerField(default=0)
+    stockout_date = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stockout_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.smoothed_demand}/day, reorder {self.reorder_quantity}"
+
+
+class PendingAlertEvaluation(models.Model):
+    """Product whose alerts a large write handed off to the evaluate_stock_alerts --pending worker"""
+    product = models.OneToOneField(
+        'products.Product', on_delete=models.CASCADE, primary_key=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.product_id} since {self.created_at}"
+
+
+@receiver(post_save, sender='products.Product')
+def evaluate_product_alerts(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-check alerts after a product's stock, thresholds or active flag are saved"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(sender.CHANGE_TRACKED_FIELDS):
+        return
+    from .services import AlertEvaluationService
+    AlertEvaluationService.schedule([instance.pk])
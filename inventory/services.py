@@ -1,23 +1,26 @@
 """
-Notification services for inventory management
+Notification and stock ledger services for inventory management
 """
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.conf import settings
-from django.contrib.auth.models import User
 from django.utils import timezone
+from django.db import transaction, OperationalError
 from datetime import datetime, timedelta
+import logging
+import time
 from products.models import Product
+from products.scan_index import ProductScanIndex
 from notifications.models import Notification
+from notifications.services import EmailQueue, StockNotificationGenerator
 from accounts.models import UserProfile
 
+logger = logging.getLogger(__name__)
+
 
 class NotificationService:
     """Service class for handling notifications"""
     
     @staticmethod
-    def create_notification(notification_type, title, message, product=None, user=None, priority='medium'):
+    def create_notification(notification_type, title, message, product=None, user=None, priority='medium',
+                            extra_data=None):
         """Create a new notification"""
         notification = Notification.objects.create(
             type=notification_type,
@@ -25,212 +28,45 @@ class NotificationService:
             message=message,
             product=product,
             user=user,
-            priority=priority
+            priority=priority,
+            extra_data=extra_data or {}
         )
         return notification
     
     @staticmethod
     def send_email_notification(notification, recipients=None):
-        """Send email notification to recipients"""
-        if not recipients:
-            # Get all managers and admins
-            recipients = User.objects.filter(
-                profile__role__in=['admin', 'manager'],
-                is_active=True
-            ).values_list('email', flat=True)
-            recipients = [email for email in recipients if email]
-        
-        if not recipients:
-            return False
-        
-        try:
-            # Prepare email content
-            subject = f"[Inventory Alert] {notification.title}"
-            
-            # Render HTML template
-            html_message = render_to_string('emails/notification_email.html', {
-                'notification': notification,
-                'site_name': 'Inventory Plus',
-                'site_url': settings.SITE_URL if hasattr(settings, 'SITE_URL') else 'http://127.0.0.1:8000'
-            })
-            
-            # Create plain text version
-            plain_message = strip_tags(html_message)
-            
-            # Send email
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=recipients,
-                html_message=html_message,
-                fail_silently=False,
-            )
-            
-            # Update notification status
-            notification.is_email_sent = True
-            notification.email_sent_at = timezone.now()
-            notification.save()
-            
-            return True
-            
-        except Exception as e:
-            print(f"Failed to send email notification: {e}")
-            return False
+        """Queue the notification email for the email worker"""
+        return bool(EmailQueue.enqueue([notification], recipients))
     
     @staticmethod
-    def check_low_stock_alerts():
+    def generate_alerts(types=None, product_ids=None):
+        """Create due stock notifications with the shared generator and queue their emails"""
+        created = StockNotificationGenerator.generate(types=types, product_ids=product_ids)
+        EmailQueue.enqueue(created)
+        return created
+    
+    @staticmethod
+    def check_low_stock_alerts(product_ids=None):
         """Check for products with low stock and create notifications"""
-        from django.db import models
-        
-        low_stock_products = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lte=models.F('minimum_stock')
-        ).exclude(
-            # Don't create duplicate notifications for the same product in the last 24 hours
-            notifications__type='low_stock',
-            notifications__created_at__gte=timezone.now() - timedelta(hours=24)
-        )
-        
-        notifications_created = 0
-        for product in low_stock_products:
-            if product.stock_quantity == 0:
-                # Out of stock - urgent priority
-                notification = NotificationService.create_notification(
-                    notification_type='out_of_stock',
-                    title=f'Out of Stock: {product.name}',
-                    message=f'Product "{product.name}" (SKU: {product.sku}) is completely out of stock. Immediate restocking required.',
-                    product=product,
-                    priority='urgent'
-                )
-            else:
-                # Low stock - high priority
-                notification = NotificationService.create_notification(
-                    notification_type='low_stock',
-                    title=f'Low Stock Alert: {product.name}',
-                    message=f'Product "{product.name}" (SKU: {product.sku}) is running low. Current stock: {product.stock_quantity}, Minimum: {product.minimum_stock}',
-                    product=product,
-                    priority='high'
-                )
-            
-            # Send email notification
-            NotificationService.send_email_notification(notification)
-            notifications_created += 1
-        
-        return notifications_created
+        return len(NotificationService.generate_alerts(('out_of_stock', 'low_stock'), product_ids))
     
     @staticmethod
-    def check_expiry_alerts():
+    def check_expiry_alerts(product_ids=None):
         """Check for products nearing expiry and create notifications"""
-        from django.db import models
-        
-        today = timezone.now().date()
-        warning_days = 7  # Alert 7 days before expiry
-        urgent_days = 3   # Urgent alert 3 days before expiry
-        
-        # Products expiring soon (within warning_days)
-        expiring_soon = Product.objects.filter(
-            is_active=True,
-            has_expiry=True,
-            expiry_date__isnull=False,
-            expiry_date__lte=today + timedelta(days=warning_days),
-            expiry_date__gt=today
-        ).exclude(
-            # Don't create duplicate notifications
-            notifications__type='expiry_soon',
-            notifications__created_at__gte=timezone.now() - timedelta(hours=24)
-        )
-        
-        # Expired products
-        expired_products = Product.objects.filter(
-            is_active=True,
-            has_expiry=True,
-            expiry_date__isnull=False,
-            expiry_date__lt=today
-        ).exclude(
-            # Don't create duplicate notifications
-            notifications__type='expired',
-            notifications__created_at__gte=timezone.now() - timedelta(hours=24)
-        )
-        
-        notifications_created = 0
-        
-        # Handle expiring soon products
-        for product in expiring_soon:
-            days_until_expiry = (product.expiry_date - today).days
-            
-            if days_until_expiry <= urgent_days:
-                priority = 'urgent'
-                title = f'URGENT: Product Expiring Soon - {product.name}'
-                message = f'Product "{product.name}" (SKU: {product.sku}) expires in {days_until_expiry} days on {product.expiry_date}. Immediate action required!'
-            else:
-                priority = 'high'
-                title = f'Product Expiring Soon: {product.name}'
-                message = f'Product "{product.name}" (SKU: {product.sku}) expires in {days_until_expiry} days on {product.expiry_date}. Please review inventory.'
-            
-            notification = NotificationService.create_notification(
-                notification_type='expiry_soon',
-                title=title,
-                message=message,
-                product=product,
-                priority=priority
-            )
-            
-            NotificationService.send_email_notification(notification)
-            notifications_created += 1
-        
-        # Handle expired products
-        for product in expired_products:
-            days_expired = (today - product.expiry_date).days
-            
-            notification = NotificationService.create_notification(
-                notification_type='expired',
-                title=f'EXPIRED PRODUCT: {product.name}',
-                message=f'Product "{product.name}" (SKU: {product.sku}) expired {days_expired} days ago on {product.expiry_date}. Remove from inventory immediately!',
-                product=product,
-                priority='urgent'
-            )
-            
-            NotificationService.send_email_notification(notification)
-            notifications_created += 1
-        
-        return notifications_created
+        return len(NotificationService.generate_alerts(('expiry_soon', 'expired'), product_ids))
     
     @staticmethod
-    def check_reorder_alerts():
+    def check_reorder_alerts(product_ids=None):
         """Check for products that need reordering"""
-        from django.db import models
-        
-        reorder_products = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lte=models.F('reorder_level')
-        ).exclude(
-            # Don't create duplicate notifications
-            notifications__type='reorder_needed',
-            notifications__created_at__gte=timezone.now() - timedelta(days=1)
-        )
-        
-        notifications_created = 0
-        for product in reorder_products:
-            notification = NotificationService.create_notification(
-                notification_type='reorder_needed',
-                title=f'Reorder Needed: {product.name}',
-                message=f'Product "{product.name}" (SKU: {product.sku}) has reached reorder level. Current stock: {product.stock_quantity}, Reorder level: {product.reorder_level}',
-                product=product,
-                priority='medium'
-            )
-            
-            NotificationService.send_email_notification(notification)
-            notifications_created += 1
-        
-        return notifications_created
+        return len(NotificationService.generate_alerts(('reorder_needed',), product_ids))
     
     @staticmethod
     def run_all_checks():
         """Run all notification checks"""
-        low_stock_count = NotificationService.check_low_stock_alerts()
-        expiry_count = NotificationService.check_expiry_alerts()
-        reorder_count = NotificationService.check_reorder_alerts()
+        counts = StockNotificationGenerator.count_by_type(NotificationService.generate_alerts())
+        low_stock_count = counts['out_of_stock'] + counts['low_stock']
+        expiry_count = counts['expiry_soon'] + counts['expired']
+        reorder_count = counts['reorder_needed']
         
         return {
             'low_stock': low_stock_count,
@@ -243,3 +79,512 @@ class NotificationService:
     def run_scheduled_checks():
         """Run all scheduled notification checks (alias for run_all_checks)"""
         return NotificationService.run_all_checks()
+
+
+class StockConflictError(Exception):
+    """Raised when a stock update keeps losing the race against other writers"""
+
+
+class StockLedgerService:
+    """
+    Single write path for product stock levels.
+
+    Every change first touches the product row (``updated_at``), which takes
+    the row lock on PostgreSQL/MySQL and the write lock on SQLite before the
+    current level is read. The new level is then written with a conditional
+    UPDATE of ``stock_quantity`` only, so two terminals adjusting the same SKU
+    at the same moment can never overwrite each other. The matching
+    StockMovement is written in the same transaction with the previous/new
+    values that were actually applied.
+    """
+
+    INBOUND_TYPES = ('in', 'returned')
+    OUTBOUND_TYPES = ('out', 'damaged', 'expired', 'transfer')
+    MAX_ATTEMPTS = 10
+
+    @staticmethod
+    def calculate_new_stock(movement_type, quantity, current_stock):
+        """Get the stock level after applying a movement of the given type"""
+        if movement_type in StockLedgerService.INBOUND_TYPES:
+            return current_stock + quantity
+        elif movement_type in StockLedgerService.OUTBOUND_TYPES:
+            return max(0, current_stock - quantity)  # Don't allow negative stock
+        else:  # adjustment
+            return quantity
+
+    @staticmethod
+    def record_movement(product, movement_type, quantity, user=None, notes=None,
+                        unit_cost=None, reference_number=None, supplier=None):
+        """Apply an in/out/adjustment movement and return the StockMovement"""
+        return StockLedgerService._apply(
+            product,
+            lambda current: StockLedgerService.calculate_new_stock(movement_type, quantity, current),
+            movement_type=movement_type,
+            quantity=quantity,
+            created_by=user,
+            notes=notes,
+            unit_cost=unit_cost,
+            reference_number=reference_number,
+            supplier=supplier,
+        )
+
+    @staticmethod
+    def apply_delta(product, delta, movement_type='adjustment', user=None, notes=None,
+                    unit_cost=None, reference_number=None, supplier=None):
+        """Add a signed delta to the stock level (used for reversals)"""
+        return StockLedgerService._apply(
+            product,
+            lambda current: max(0, current + delta),
+            movement_type=movement_type,
+            quantity=abs(delta),
+            created_by=user,
+            notes=notes,
+            unit_cost=unit_cost,
+            reference_number=reference_number,
+            supplier=supplier,
+        )
+
+    @staticmethod
+    def _transaction_id(reference_number):
+        """Id of the InventoryTransaction a reference number belongs to, if any"""
+        from .models import InventoryTransaction
+
+        if not reference_number:
+            return None
+        return InventoryTransaction.objects.filter(
+            reference_number=reference_number
+        ).values_list('id', flat=True).first()
+
+    @staticmethod
+    def _apply(product, compute_new_stock, **movement_fields):
+        from .models import StockMovement
+
+        product_id = getattr(product, 'pk', product)
+        movement_fields.setdefault(
+            'inventory_transaction_id',
+            StockLedgerService._transaction_id(movement_fields.get('reference_number')),
+        )
+
+        for attempt in range(StockLedgerService.MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    # Write before reading so the lock is held for the whole
+                    # read-compute-write cycle
+                    if not Product.objects.filter(pk=product_id).update(updated_at=timezone.now()):
+                        raise Product.DoesNotExist(f'Product {product_id} does not exist')
+
+                    current_stock = Product.objects.values_list(
+                        'stock_quantity', flat=True
+                    ).get(pk=product_id)
+                    new_stock = compute_new_stock(current_stock)
+
+                    updated = Product.objects.filter(
+                        pk=product_id,
+                        stock_quantity=current_stock,
+                    ).update(stock_quantity=new_stock)
+                    if not updated:
+                        raise StockConflictError(f'Stock for product {product_id} changed concurrently')
+
+                    movement = StockMovement.objects.create(
+                        product_id=product_id,
+                        previous_stock=current_stock,
+                        new_stock=new_stock,
+                        **movement_fields
+                    )
+                    ProductScanIndex.invalidate_on_commit([product_id])
+                    AlertEvaluationService.schedule([product_id])
+                break
+            except (OperationalError, StockConflictError):
+                # SQLite reports write contention as "database is locked"
+                if attempt == StockLedgerService.MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(min(0.005 * 2 ** attempt, 0.5))
+
+        if isinstance(product, Product):
+            product.stock_quantity = new_stock
+        return movement
+
+    @staticmethod
+    def parse_quantity(value):
+        """
+        Whole-number quantity from a form or JSON value.
+
+        Integers, integral floats (2.0) and digit strings are accepted;
+        anything else, including 2.5, "2.5", booleans and None, raises
+        ValueError.
+        """
+        if isinstance(value, bool) or value is None:
+            raise ValueError(value)
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(value)
+            return int(value)
+        if isinstance(value, int):
+            return value
+        return int(str(value).strip())
+
+    @staticmethod
+    def bulk_record_movements(lines, user=None, notes=None, reference_number=None, batch_size=500):
+        """
+        Apply many (sku, movement_type, quantity) lines in one transaction.
+
+        SKUs are resolved with one query per ``batch_size`` SKUs, new levels
+        are computed in memory (lines for the same SKU are applied in order),
+        then all movements are inserted with bulk_create and all products
+        written with bulk_update. The transaction is retried like _apply() when the
+        database reports a lock. Returns one result dict per input line;
+        invalid lines are reported and skipped.
+        """
+        from .models import StockMovement
+
+        valid_types = {choice for choice, _ in StockMovement.MOVEMENT_TYPES}
+        results = []
+        parsed = []
+
+        for index, line in enumerate(lines, start=1):
+            sku = str(line.get('sku') or '').strip().upper()
+            movement_type = str(line.get('movement_type') or 'adjustment').strip().lower()
+            result = {'line': index, 'sku': sku, 'movement_type': movement_type, 'status': 'error'}
+            results.append(result)
+
+            try:
+                quantity = StockLedgerService.parse_quantity(line.get('quantity'))
+            except (TypeError, ValueError):
+                result['error'] = 'Quantity must be a whole number'
+                continue
+
+            result['quantity'] = quantity
+            if not sku:
+                result['error'] = 'SKU is required'
+            elif movement_type not in valid_types:
+                result['error'] = f'Unknown movement type "{movement_type}"'
+            elif quantity < 0 or (quantity == 0 and movement_type != 'adjustment'):
+                result['error'] = 'Quantity must be greater than 0'
+            else:
+                parsed.append((result, sku, movement_type, quantity))
+
+        if not parsed:
+            return results
+
+        skus = list({sku: None for _, sku, _, _ in parsed})
+        transaction_id = StockLedgerService._transaction_id(reference_number)
+
+        for attempt in range(StockLedgerService.MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    now = timezone.now()
+                    products = {}
+                    # Lock every affected row before reading current levels, chunked
+                    # so each statement stays under SQLite's parameter limit
+                    for offset in range(0, len(skus), batch_size):
+                        chunk = skus[offset:offset + batch_size]
+                        Product.objects.filter(sku__in=chunk).update(updated_at=now)
+                        products.update(
+                            (product.sku, product)
+                            for product in Product.objects.filter(sku__in=chunk).only('id', 'sku', 'stock_quantity')
+                        )
+
+                    movements = []
+                    outcomes = []
+                    for result, sku, movement_type, quantity in parsed:
+                        product = products.get(sku)
+                        if product is None:
+                            outcomes.append((result, {'error': 'Unknown SKU'}))
+                            continue
+
+                        previous_stock = product.stock_quantity
+                        new_stock = StockLedgerService.calculate_new_stock(movement_type, quantity, previous_stock)
+                        product.stock_quantity = new_stock
+
+                        movements.append(StockMovement(
+                            product_id=product.pk,
+                            movement_type=movement_type,
+                            quantity=quantity,
+                            previous_stock=previous_stock,
+                            new_stock=new_stock,
+                            reference_number=reference_number,
+                            inventory_transaction_id=transaction_id,
+                            notes=notes,
+                            created_by=user,
+                        ))
+                        outcomes.append((
+                            result, {'status': 'ok', 'previous_stock': previous_stock, 'new_stock': new_stock}
+                        ))
+
+                    StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+                    Product.objects.bulk_update(products.values(), ['stock_quantity'], batch_size=batch_size)
+                    ProductScanIndex.invalidate_on_commit(product.pk for product in products.values())
+                    AlertEvaluationService.schedule(product.pk for product in products.values())
+                break
+            except OperationalError:
+                # SQLite reports write contention as "database is locked"
+                if attempt == StockLedgerService.MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(min(0.005 * 2 ** attempt, 0.5))
+
+        # Results are only filled in once the transaction has committed
+        for result, outcome in outcomes:
+            result.update(outcome)
+        return results
+
+    @staticmethod
+    def bulk_apply_deltas(deltas, movement_type='adjustment', user=None, notes=None,
+                          reference_number=None, batch_size=500):
+        """
+        Add signed deltas {product_id: delta} to many stock levels at once.
+
+        Every affected product is locked with one UPDATE before its level is
+        read, new levels are clamped at zero and written with bulk_update, and
+        one movement per product is inserted with bulk_create, all in a single
+        transaction. The transaction is retried like _apply() when the
+        database reports a lock. Returns the created movements.
+        """
+        from .models import StockMovement
+
+        deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+        if not deltas:
+            return []
+        product_ids = list(deltas)
+        transaction_id = StockLedgerService._transaction_id(reference_number)
+
+        for attempt in range(StockLedgerService.MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    now = timezone.now()
+                    products = []
+                    # Chunked so each statement stays under SQLite's parameter limit
+                    for offset in range(0, len(product_ids), batch_size):
+                        chunk = product_ids[offset:offset + batch_size]
+                        Product.objects.filter(pk__in=chunk).update(updated_at=now)
+                        products.extend(Product.objects.filter(pk__in=chunk).only('id', 'stock_quantity'))
+
+                    movements = []
+                    for product in products:
+                        delta = deltas[product.pk]
+                        previous_stock = product.stock_quantity
+                        product.stock_quantity = max(0, previous_stock + delta)
+                        movements.append(StockMovement(
+                            product_id=product.pk,
+                            movement_type=movement_type,
+                            quantity=abs(delta),
+                            previous_stock=previous_stock,
+                            new_stock=product.stock_quantity,
+                            reference_number=reference_number,
+                            inventory_transaction_id=transaction_id,
+                            notes=notes,
+                            created_by=user,
+                        ))
+
+                    StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+                    Product.objects.bulk_update(products, ['stock_quantity'], batch_size=batch_size)
+                    ProductScanIndex.invalidate_on_commit(product.pk for product in products)
+                    AlertEvaluationService.schedule(product.pk for product in products)
+                break
+            except OperationalError:
+                # SQLite reports write contention as "database is locked"
+                if attempt == StockLedgerService.MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(min(0.005 * 2 ** attempt, 0.5))
+
+        return movements
+
+
+class StockAlertService:
+    """Set-based evaluation of configured StockAlert rows"""
+
+    # StockAlert.alert_type -> Notification.type where the names differ
+    NOTIFICATION_TYPES = {'reorder_point': 'reorder_needed'}
+    HIGH_PRIORITY_TYPES = ('out_of_stock', 'expired')
+
+    # Each expiry_soon threshold binds two parameters; stay under SQLite's 999
+    EXPIRY_THRESHOLDS_PER_QUERY = 400
+
+    # Alert ids per IN (...) lookup, for the same limit
+    LOOKUP_BATCH = 900
+
+    @staticmethod
+    def alert_conditions(candidates, today):
+        """
+        Yield (alert_type, Q) pairs matching the alerts that should fire.
+
+        Mirrors StockAlert.should_trigger(). expiry_soon thresholds are
+        days, so they are expanded into one date comparison per distinct
+        threshold instead of doing date arithmetic per row.
+        """
+        from django.db.models import F, Q
+
+        yield 'low_stock', Q(product__stock_quantity__lte=F('threshold_value'))
+        yield 'out_of_stock', Q(product__stock_quantity__lte=0)
+        yield 'reorder_point', Q(product__stock_quantity__lte=F('threshold_value'))
+        yield 'expired', Q(product__has_expiry=True, product__expiry_date__lt=today)
+
+        thresholds = sorted(
+            candidates.filter(alert_type='expiry_soon').order_by().values_list('threshold_value', flat=True).distinct()
+        )
+        step = StockAlertService.EXPIRY_THRESHOLDS_PER_QUERY
+        for start in range(0, len(thresholds), step):
+            condition = Q()
+            for days in thresholds[start:start + step]:
+                condition |= Q(threshold_value=days, product__expiry_date__lte=today + timedelta(days=days))
+            yield 'expiry_soon', Q(product__has_expiry=True) & condition
+
+    @staticmethod
+    def evaluate(product_ids=None, now=None, batch_size=1000):
+        """
+        Trigger every active alert whose condition holds; return counts per alert type.
+
+        Each alert type selects the pks of the matching alerts (locking them
+        where the database supports it) and stamps last_triggered on exactly
+        those. The same pks are then read back with their product and turned
+        into notifications with bulk_create, all in one transaction. Alerts
+        already triggered today and alerts on deactivated products are
+        skipped. Pass ``product_ids`` to evaluate only the alerts of those
+        products.
+        """
+        from django.db.models import Q
+        from .models import StockAlert
+
+        now = now or timezone.now()
+        today = timezone.localdate(now)
+        start_of_day = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+
+        candidates = StockAlert.objects.filter(is_active=True, product__is_active=True).filter(
+            Q(last_triggered__isnull=True) | Q(last_triggered__lt=start_of_day)
+        )
+        if product_ids is not None:
+            candidates = candidates.filter(product_id__in=list(product_ids))
+
+        counts = {alert_type: 0 for alert_type, _ in StockAlert.ALERT_TYPES}
+        step = StockAlertService.LOOKUP_BATCH
+        triggered = []
+        with transaction.atomic():
+            for alert_type, condition in StockAlertService.alert_conditions(candidates, today):
+                pks = list(
+                    candidates.filter(condition, alert_type=alert_type).select_for_update().values_list('pk', flat=True)
+                )
+                for start in range(0, len(pks), step):
+                    StockAlert.objects.filter(pk__in=pks[start:start + step]).update(last_triggered=now)
+                counts[alert_type] += len(pks)
+                triggered.extend(pks)
+
+            for start in range(0, len(triggered), step):
+                StockAlertService._create_notifications(
+                    StockAlert.objects.filter(pk__in=triggered[start:start + step]), batch_size
+                )
+
+        return counts
+
+    @staticmethod
+    def _create_notifications(triggered, batch_size):
+        """
+        bulk_create one notification per stamped alert, same wording as StockAlert.trigger_alert().
+
+        Each batch is queued for email to the alert's own recipients.
+        """
+        from .models import StockAlert
+
+        labels = dict(StockAlert.ALERT_TYPES)
+        rows = triggered.order_by().values_list(
+            'id', 'alert_type', 'threshold_value', 'product_id', 'product__name', 'product__sku',
+            'product__forecast__reorder_quantity',
+        )
+        batch = []
+        for alert_id, alert_type, threshold_value, product_id, name, sku, reorder_quantity in rows.iterator(
+            chunk_size=batch_size
+        ):
+            label = labels[alert_type]
+            extra_data = {'stock_alert_id': str(alert_id), 'threshold_value': threshold_value}
+            if alert_type == 'reorder_point' and reorder_quantity is not None:
+                extra_data['suggested_order_quantity'] = reorder_quantity
+            batch.append(Notification(
+                type=StockAlertService.NOTIFICATION_TYPES.get(alert_type, alert_type),
+                title=f"{label}: {name}",
+                message=f"Product {name} (SKU: {sku}) has triggered a {label.lower()} alert.",
+                product_id=product_id,
+                priority='high' if alert_type in StockAlertService.HIGH_PRIORITY_TYPES else 'medium',
+                extra_data=extra_data,
+            ))
+            if len(batch) >= batch_size:
+                EmailQueue.enqueue(Notification.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            EmailQueue.enqueue(Notification.objects.bulk_create(batch))
+
+
+class AlertEvaluationService:
+    """
+    Re-check alerts for just the products a committed change touched.
+
+    Writers call schedule() inside their transaction. Up to INLINE_LIMIT
+    products are checked inline once it commits: the low-stock, reorder
+    and expiry checks plus the StockAlert rules, a few set-based queries.
+    Larger writes (imports, bulk adjustments, cancellations) only queue
+    their products in PendingAlertEvaluation, in the same transaction, and
+    the evaluate_stock_alerts --pending worker evaluates them, so no
+    request waits on thousands of products. A batch that fails is logged
+    and picked up by the periodic full scans, which also cover time-based
+    expiry.
+    """
+
+    BATCH_SIZE = 500
+    INLINE_LIMIT = 100
+
+    @staticmethod
+    def schedule(product_ids):
+        """Evaluate alerts for these products once the current transaction commits, or queue them"""
+        product_ids = list(dict.fromkeys(product_ids))
+        if len(product_ids) > AlertEvaluationService.INLINE_LIMIT:
+            AlertEvaluationService.defer(product_ids)
+        elif product_ids:
+            transaction.on_commit(lambda: AlertEvaluationService.evaluate(product_ids))
+
+    @staticmethod
+    def defer(product_ids):
+        """Queue products for the evaluate_stock_alerts --pending worker"""
+        from .models import PendingAlertEvaluation
+
+        PendingAlertEvaluation.objects.bulk_create(
+            [PendingAlertEvaluation(product_id=product_id) for product_id in product_ids],
+            batch_size=AlertEvaluationService.BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def process_pending(limit=None):
+        """
+        Evaluate queued products, oldest first, BATCH_SIZE at a time.
+
+        Each batch is dequeued before it is evaluated, so a write that
+        queues a product again meanwhile gets its own later pass. Batches
+        not yet taken stay queued if the worker stops. Returns (products,
+        notifications created).
+        """
+        from .models import PendingAlertEvaluation
+
+        processed = created = 0
+        while limit is None or processed < limit:
+            size = AlertEvaluationService.BATCH_SIZE if limit is None else min(
+                AlertEvaluationService.BATCH_SIZE, limit - processed
+            )
+            batch = list(PendingAlertEvaluation.objects.values_list('product_id', flat=True)[:size])
+            if not batch:
+                break
+            PendingAlertEvaluation.objects.filter(product_id__in=batch).delete()
+            created += AlertEvaluationService.evaluate(batch)
+            processed += len(batch)
+        return processed, created
+
+    @staticmethod
+    def evaluate(product_ids):
+        """Run every alert check for the given products; return notifications created"""
+        product_ids = list(product_ids)
+        created = 0
+        for start in range(0, len(product_ids), AlertEvaluationService.BATCH_SIZE):
+            batch = product_ids[start:start + AlertEvaluationService.BATCH_SIZE]
+            try:
+                created += len(NotificationService.generate_alerts(product_ids=batch))
+                created += sum(StockAlertService.evaluate(product_ids=batch).values())
+            except Exception:
+                # The writer's transaction has committed; its request must not fail here
+                logger.exception(f'Alert evaluation failed for {len(batch)} products')
+        return created
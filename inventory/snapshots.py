@@ -0,0 +1,246 @@
+"""
+Daily stock snapshots and point-in-time stock queries
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+
+def day_end(day):
+    """The instant a snapshot of ``day`` describes: local midnight after it"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def last_complete_day(at=None):
+    """Latest day whose end is not after ``at`` (default: now)"""
+    return timezone.localtime(at or timezone.now()).date() - timedelta(days=1)
+
+
+def stock_status_for(quantity, minimum_stock, reorder_level):
+    """Same rule as the generated Product.stock_status column"""
+    if quantity <= 0:
+        return 'out'
+    if quantity <= minimum_stock:
+        return 'low'
+    if quantity <= reorder_level:
+        return 'reorder'
+    return 'ok'
+
+
+def _net_change():
+    return Sum(F('new_stock') - F('previous_stock'))
+
+
+def _net_changes_by_product(start, end):
+    """{product_id: net stock change} for movements in [start, end)"""
+    from .models import StockMovement
+
+    return dict(
+        StockMovement.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by().values('product_id').annotate(net=_net_change()).values_list('product_id', 'net')
+    )
+
+
+def take_snapshots(days, batch_size=2000):
+    """
+    Write (or overwrite) snapshots of every product for past days.
+
+    Levels are worked back from current stock by undoing movements one day
+    at a time, newest day first: qty(D) = qty(D + 1) - net movements during
+    D + 1. Each day therefore costs one GROUP BY over that day's movements,
+    which makes the same routine serve the nightly run and ledger backfills.
+    Deactivated products are included, so history does not depend on
+    today's is_active; products created after a day get no row for it.
+    Prices and thresholds are the current ones. Returns the rows written.
+    """
+    from products.models import Product
+    from .models import StockSnapshot
+
+    days = sorted(set(days), reverse=True)
+    if not days:
+        return 0
+    if days[0] > last_complete_day():
+        raise ValueError(f'{days[0]} has not ended yet')
+
+    with transaction.atomic():
+        # Read stock and the movements after it in one transaction so they agree
+        now = timezone.now()
+        products = list(Product.objects.values_list(
+            'id', 'stock_quantity', 'unit_price', 'minimum_stock', 'reorder_level', 'created_at'
+        ))
+        levels = {product_id: quantity for product_id, quantity, *_ in products}
+        changes = _net_changes_by_product(day_end(days[0]), now)
+
+    written = 0
+    window_end = day_end(days[0])
+    for day in days:
+        if day_end(day) < window_end:
+            changes = _net_changes_by_product(day_end(day), window_end)
+        for product_id, net in changes.items():
+            if product_id in levels:
+                levels[product_id] -= net
+        window_end = day_end(day)
+
+        rows = []
+        for product_id, _, unit_price, minimum_stock, reorder_level, created_at in products:
+            if created_at >= window_end:
+                continue
+            # A ledger gap can leave the replay below zero; stock never is
+            quantity = max(levels[product_id], 0)
+            rows.append(StockSnapshot(
+                product_id=product_id,
+                date=day,
+                quantity=quantity,
+                value=quantity * unit_price,
+                status=stock_status_for(quantity, minimum_stock, reorder_level),
+            ))
+        with transaction.atomic():
+            StockSnapshot.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['product', 'date'],
+                update_fields=['quantity', 'value', 'status'],
+            )
+        written += len(rows)
+    return written
+
+
+def missing_days(limit=None):
+    """Complete days after the newest snapshot (just yesterday when none exist)"""
+    from .models import StockSnapshot
+
+    yesterday = last_complete_day()
+    newest = StockSnapshot.objects.aggregate(newest=Max('date'))['newest']
+    first = newest + timedelta(days=1) if newest else yesterday
+    if limit:
+        first = max(first, yesterday - timedelta(days=limit - 1))
+    return [first + timedelta(days=offset) for offset in range((yesterday - first).days + 1)]
+
+
+def _stock_totals(products):
+    """Current quantity and value of ``products``"""
+    totals = products.aggregate(
+        quantity=Sum('stock_quantity'),
+        value=Sum(F('stock_quantity') * F('unit_price'), output_field=DecimalField()),
+    )
+    return totals['quantity'] or 0, Decimal(totals['value'] or 0)
+
+
+def _movement_totals(movements):
+    """Movement count, net quantity and net value (at current prices) of ``movements``"""
+    totals = movements.aggregate(
+        movements=Count('id'),
+        quantity=_net_change(),
+        value=Sum(ExpressionWrapper(
+            (F('new_stock') - F('previous_stock')) * F('product__unit_price'),
+            output_field=DecimalField(),
+        )),
+    )
+    return totals['movements'], totals['quantity'] or 0, Decimal(totals['value'] or 0)
+
+
+def stock_as_of(at, product=None, category=None):
+    """
+    Stock quantity and value of a product, a category or everything at ``at``.
+
+    A date means the end of that day. The nearest snapshot at or before
+    ``at`` is read and only the movements between it and ``at`` are
+    applied, plus the opening stock of products created in between; with
+    no earlier snapshot the movements since ``at`` are undone from current
+    stock of the products that existed at ``at``. Snapshots, movements and
+    products are scoped the same way and never by today's is_active.
+    Movement values use current unit prices.
+    """
+    from products.models import Product
+    from .models import StockMovement, StockSnapshot
+
+    if not isinstance(at, datetime):
+        at = day_end(at)
+
+    products = Product.objects.all()
+    if product is not None:
+        products = products.filter(pk=product)
+    if category is not None:
+        products = products.filter(category_id=category)
+    snapshots = StockSnapshot.objects.filter(product__in=products)
+    movements = StockMovement.objects.filter(product__in=products)
+
+    snapshot_date = snapshots.filter(date__lte=last_complete_day(at)).aggregate(
+        snapshot_date=Max('date')
+    )['snapshot_date']
+    if snapshot_date:
+        base = snapshots.filter(date=snapshot_date).aggregate(quantity=Sum('quantity'), value=Sum('value'))
+        quantity, value = base['quantity'] or 0, Decimal(base['value'] or 0)
+        count, net_quantity, net_value = _movement_totals(
+            movements.filter(created_at__gte=day_end(snapshot_date), created_at__lt=at)
+        )
+        quantity += net_quantity
+        value += net_value
+
+        # Stock a product was created with has no movement: current stock less its whole ledger
+        created = products.filter(created_at__gte=day_end(snapshot_date), created_at__lt=at)
+        stock_quantity, stock_value = _stock_totals(created)
+        _, ledger_quantity, ledger_value = _movement_totals(movements.filter(product__in=created))
+        quantity += stock_quantity - ledger_quantity
+        value += stock_value - ledger_value
+    else:
+        existing = products.filter(created_at__lt=at)
+        quantity, value = _stock_totals(existing)
+        count, net_quantity, net_value = _movement_totals(
+            movements.filter(product__in=existing, created_at__gte=at)
+        )
+        quantity -= net_quantity
+        value -= net_value
+
+    return {
+        'at': at,
+        'snapshot_date': snapshot_date,
+        'movements_applied': count,
+        'quantity': quantity,
+        'value': value.quantize(Decimal('0.01')),
+    }
+
+
+def daily_trend(days=7):
+    """
+    Low-stock count, quantity and value per day for the last ``days`` days.
+
+    Past days come from one grouped query over the snapshots (None where
+    no snapshot was taken); today is read live from the products table.
+    Both cover the currently active products, so the days compare.
+    """
+    from products.models import Product
+    from .models import StockSnapshot
+
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = StockSnapshot.objects.filter(
+        date__gte=start, date__lt=today, product__is_active=True
+    ).values('date').annotate(
+        low_stock=Count('id', filter=Q(status__in=Product.LOW_STOCK_STATUSES)),
+        quantity=Sum('quantity'),
+        value=Sum('value'),
+    ).order_by()
+    by_date = {row['date']: row for row in rows}
+
+    live = Product.objects.filter(is_active=True).aggregate(
+        low_stock=Count('id', filter=Q(stock_status__in=Product.LOW_STOCK_STATUSES)),
+        quantity=Sum('stock_quantity'),
+        value=Sum(F('stock_quantity') * F('unit_price'), output_field=DecimalField()),
+    )
+    by_date[today] = live
+
+    trend = []
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        row = by_date.get(day, {})
+        trend.append({
+            'date': day,
+            'count': row.get('low_stock'),
+            'quantity': row.get('quantity'),
+            'value': row.get('value'),
+        })
+    return trend
@@ -30,8 +30,11 @@ urlpatterns = [
     path('reports/stock/', views.stock_report_view, name='stock_report'),
     path('reports/movements/', views.movement_report_view, name='movement_report'),
     path('reports/valuation/', views.valuation_report_view, name='valuation_report'),
+    path('export/<str:dataset>/', views.export_view, name='export'),
     
     # API endpoints
     path('api/stock-levels/', views.stock_levels_api, name='api_stock_levels'),
+    path('api/stock-as-of/', views.stock_as_of_api, name='api_stock_as_of'),
     path('api/recent-movements/', views.recent_movements_api, name='api_recent_movements'),
+    path('api/bulk-adjust/', views.bulk_adjustment_api, name='api_bulk_adjust'),
 ]
\ No newline at end of file
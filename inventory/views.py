@@ -6,14 +6,22 @@ from django.urls import reverse_lazy
 from django.http import JsonResponse
 from django.db.models import Q, Sum, F
 from django.contrib import messages
+from django.views.decorators.http import condition, require_POST
 from .models import StockMovement, InventoryTransaction, StockAlert
+from inventory_plus.pagination import KeysetPaginationMixin, KeysetPaginator, InvalidCursor
+import hashlib
+import logging
+import uuid
 
+logger = logging.getLogger(__name__)
 
-class StockMovementListView(LoginRequiredMixin, ListView):
+
+class StockMovementListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = StockMovement
     template_name = 'inventory/movement_list.html'
     context_object_name = 'movements'
     paginate_by = 20
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         return StockMovement.objects.select_related('product', 'created_by', 'supplier')
@@ -35,19 +43,22 @@ class StockMovementCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy('inventory:movement_list')
     
     def form_valid(self, form):
-        form.instance.created_by = self.request.user
-        # Set previous stock and calculate new stock
-        product = form.instance.product
-        form.instance.previous_stock = product.stock_quantity
-        
-        if form.instance.movement_type == 'in':
-            form.instance.new_stock = product.stock_quantity + form.instance.quantity
-        elif form.instance.movement_type == 'out':
-            form.instance.new_stock = product.stock_quantity - form.instance.quantity
-        else:  # adjustment
-            form.instance.new_stock = form.instance.quantity
+        from django.http import HttpResponseRedirect
+        from .services import StockLedgerService
         
-        return super().form_valid(form)
+        # Route through the stock ledger so the product is updated atomically
+        # together with the movement record
+        self.object = StockLedgerService.record_movement(
+            product=form.cleaned_data['product'],
+            movement_type=form.cleaned_data['movement_type'],
+            quantity=abs(form.cleaned_data['quantity']),
+            user=self.request.user,
+            notes=form.cleaned_data.get('notes'),
+            unit_cost=form.cleaned_data.get('unit_cost'),
+            reference_number=form.cleaned_data.get('reference_number'),
+            supplier=form.cleaned_data.get('supplier'),
+        )
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class InventoryTransactionListView(LoginRequiredMixin, ListView):
@@ -56,6 +67,12 @@ class InventoryTransactionListView(LoginRequiredMixin, ListView):
     context_object_name = 'transactions'
     paginate_by = 20
 
+    def get_queryset(self):
+        # Meta.ordering is not applied to GROUP BY queries, so order explicitly
+        return InventoryTransaction.with_totals(
+            InventoryTransaction.objects.select_related('supplier')
+        ).order_by('-created_at', '-id')
+
 
 class InventoryTransactionDetailView(LoginRequiredMixin, DetailView):
     model = InventoryTransaction
@@ -113,7 +130,7 @@ class StockAlertDeleteView(LoginRequiredMixin, DeleteView):
 @login_required
 def stock_adjustment_view(request, product_id):
     from products.models import Product
-    from django.db import transaction
+    from .services import StockLedgerService
     
     try:
         product = get_object_or_404(Product, id=product_id)
@@ -131,33 +148,15 @@ def stock_adjustment_view(request, product_id):
                 messages.error(request, 'الكمية يجب أن تكون أكبر من 0')
                 return render(request, 'inventory/stock_adjust.html', {'product': product})
             
-            # Calculate new stock based on movement type
-            current_stock = product.stock_quantity
-            
-            if movement_type == 'in':
-                new_stock = current_stock + quantity
-            elif movement_type == 'out':
-                new_stock = max(0, current_stock - quantity)  # Don't allow negative stock
-            else:  # adjustment
-                new_stock = quantity
-            
-            # Use database transaction to ensure consistency
-            with transaction.atomic():
-                # Create stock movement record
-                stock_movement = StockMovement.objects.create(
-                    product=product,
-                    movement_type=movement_type,
-                    quantity=quantity,
-                    previous_stock=current_stock,
-                    new_stock=new_stock,
-                    notes=notes or None,
-                    created_by=request.user
-                    # Don't include supplier field at all
-                )
-                
-                # Update product stock
-                product.stock_quantity = new_stock
-                product.save()
+            # Apply the movement through the stock ledger (atomic, no lost updates)
+            stock_movement = StockLedgerService.record_movement(
+                product=product,
+                movement_type=movement_type,
+                quantity=quantity,
+                user=request.user,
+                notes=notes or None,
+            )
+            new_stock = stock_movement.new_stock
             
             # Add success message
             movement_display = {
@@ -178,10 +177,55 @@ def stock_adjustment_view(request, product_id):
     return render(request, 'inventory/stock_adjust.html', {'product': product})
 
 
+def _parse_bulk_adjustment_csv(text):
+    """Turn CSV text (sku, movement_type, quantity) into bulk adjustment lines"""
+    import csv
+    
+    lines = []
+    for row in csv.reader(text.splitlines()):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if not lines and row[0].strip().lower() == 'sku':
+            continue  # header row
+        row = row + [''] * (3 - len(row))
+        lines.append({'sku': row[0], 'movement_type': row[1], 'quantity': row[2]})
+    return lines
+
+
 @login_required
 def bulk_stock_adjustment_view(request):
-    # Implementation for bulk stock adjustment
-    return render(request, 'inventory/bulk_adjust.html')
+    from .services import StockLedgerService
+    
+    results = None
+    
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload:
+            text = upload.read().decode('utf-8-sig', errors='replace')
+        else:
+            text = request.POST.get('lines', '')
+        
+        lines = _parse_bulk_adjustment_csv(text)
+        if not lines:
+            messages.error(request, 'No adjustment lines found. Upload a CSV with sku, movement_type, quantity.')
+        else:
+            try:
+                results = StockLedgerService.bulk_record_movements(
+                    lines,
+                    user=request.user,
+                    notes=request.POST.get('notes', '').strip() or None,
+                    reference_number=request.POST.get('reference_number', '').strip() or None,
+                )
+                applied = sum(1 for result in results if result['status'] == 'ok')
+                failed = len(results) - applied
+                if applied:
+                    messages.success(request, f'Applied {applied} stock adjustments.')
+                if failed:
+                    messages.warning(request, f'{failed} lines could not be applied.')
+            except Exception as e:
+                messages.error(request, f'Error applying bulk adjustment: {str(e)}')
+    
+    return render(request, 'inventory/bulk_adjust.html', {'results': results})
 
 
 @login_required
@@ -195,8 +239,10 @@ def complete_transaction(request, pk):
 @login_required
 def cancel_transaction(request, pk):
     transaction = get_object_or_404(InventoryTransaction, pk=pk)
-    transaction.cancel_transaction()
-    messages.success(request, f'Transaction {transaction.reference_number} cancelled.')
+    if transaction.cancel_transaction(user=request.user):
+        messages.success(request, f'Transaction {transaction.reference_number} cancelled.')
+    else:
+        messages.info(request, f'Transaction {transaction.reference_number} was already cancelled.')
     return redirect('inventory:transaction_detail', pk=pk)
 
 
@@ -216,34 +262,258 @@ def movement_report_view(request):
 
 @login_required
 def valuation_report_view(request):
+    """Stock valued from the movement ledger (see revalue_stock); shelf price where not yet revalued"""
+    from django.db.models import DecimalField
+    from django.db.models.functions import Coalesce
     from products.models import Product
-    products = Product.objects.filter(is_active=True).annotate(
-        total_value=F('stock_quantity') * F('unit_price')
+    shelf_value = F('stock_quantity') * F('unit_price')
+    products = Product.objects.filter(is_active=True).select_related('valuation').annotate(
+        total_value=Coalesce('valuation__fifo_value', shelf_value, output_field=DecimalField()),
+        average_value=Coalesce('valuation__average_value', shelf_value, output_field=DecimalField()),
     )
-    total_valuation = products.aggregate(total=Sum('total_value'))['total'] or 0
+    totals = products.aggregate(fifo=Sum('total_value'), average=Sum('average_value'))
     
     return render(request, 'inventory/valuation_report.html', {
         'products': products,
-        'total_valuation': total_valuation
+        'total_valuation': totals['fifo'] or 0,
+        'average_valuation': totals['average'] or 0,
     })
 
 
+@login_required
+def export_view(request, dataset):
+    """Stream products, movements or valuation as CSV or JSON Lines"""
+    from django.http import StreamingHttpResponse
+    from django.utils import timezone
+    from .exports import EXPORT_FORMATS, ExportError, export_queryset, iter_export, parse_filters
+    
+    export_format = request.GET.get('format', 'csv')
+    try:
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f'Unknown format "{export_format}". Choose from: {", ".join(EXPORT_FORMATS)}')
+        filters = parse_filters(
+            date_from=request.GET.get('date_from'),
+            date_to=request.GET.get('date_to'),
+            category=request.GET.get('category'),
+        )
+        # Validate the dataset before the response starts streaming
+        export_queryset(dataset, filters)
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    stream = iter_export(dataset, export_format, filters)
+    
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(stream, content_type=f'{content_type}; charset=utf-8')
+    filename = f'{dataset}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # API Views
+# Columns served by the stock feed, in both full and delta mode
+STOCK_FEED_FIELDS = (
+    'id', 'name', 'sku', 'stock_quantity', 'minimum_stock', 'maximum_stock',
+    'reorder_level', 'stock_status', 'is_active', 'updated_at',
+)
+STOCK_FEED_ORDERING = ('updated_at', 'id')
+
+# Sorts after every real id, so a sync cursor covers all rows of its timestamp
+_LAST_ID = uuid.UUID(int=(1 << 128) - 1)
+
+
+def _settled_key():
+    """
+    Feed position up to which every write has committed.
+
+    Changes newer than Product.CHANGE_SETTLE_TIME may still be joined by
+    slower transactions stamped earlier, so sync cursors never pass it.
+    """
+    from django.utils import timezone
+    from products.models import Product
+    return {'updated_at': timezone.now() - Product.CHANGE_SETTLE_TIME, 'id': _LAST_ID}
+
+
+def _stock_levels_etag(request):
+    """
+    Catalogue version for If-None-Match polls of the full listing, or None.
+
+    Product count plus newest updated_at covers edits, additions and hard
+    deletes. The ETag is scoped to the ?cursor= / ?limit= page asked for.
+    Delta polls (?since=) get none: they already return only changes, and
+    counting the whole table on every poll would cost more than they do.
+    Within the settle window a late commit need not move the version, so
+    no ETag (and no 304) is given then either. @condition computes this
+    once per request and reuses it for the response header.
+    """
+    from django.db.models import Count, Max
+    from products.models import Product
+    
+    if 'since' in request.GET:
+        return None
+    
+    version = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    if version['latest'] is None:
+        etag = f'stock-{version["count"]}'
+    elif version['latest'] > _settled_key()['updated_at']:
+        return None
+    else:
+        etag = f'stock-{version["count"]}-{version["latest"].timestamp():.6f}'
+    
+    if 'cursor' in request.GET or 'limit' in request.GET:
+        page = f'{request.GET.get("cursor", "")}:{request.GET.get("limit", "")}'
+        etag = f'{etag}-{hashlib.sha1(page.encode()).hexdigest()[:16]}'
+    return etag
+
+
 @login_required
+@condition(etag_func=_stock_levels_etag)
 def stock_levels_api(request):
+    """
+    Stock levels for dashboards and POS terminals.
+
+    Without ``since`` the active catalogue is returned in full (paged with
+    ?cursor= / ?limit= when asked) together with a ``sync_cursor``. Passing
+    that back as ``?since=`` returns the products changed after it,
+    deactivated ones included, plus the cursor to poll with next time.
+    Changes from the last Product.CHANGE_SETTLE_TIME can be sent again by
+    the next poll. Polls with a matching If-None-Match get a 304 when
+    nothing changed.
+    """
     from products.models import Product
-    products = Product.objects.filter(is_active=True).values(
-        'id', 'name', 'sku', 'stock_quantity', 'minimum_stock'
+    
+    if 'since' in request.GET:
+        return _stock_levels_delta(request)
+    
+    # Taken before reading rows, so changes made meanwhile are sent again
+    feed = Product.objects.values(*STOCK_FEED_FIELDS)
+    sync_cursor = KeysetPaginator(feed, STOCK_FEED_ORDERING).encode_cursor(_settled_key(), 'next')
+    products = feed.filter(is_active=True)
+    
+    # Page through the catalogue with ?cursor= / ?limit= instead of one big payload
+    if 'cursor' in request.GET or 'limit' in request.GET:
+        page, error = _cursor_page(request, products, ('name', 'id'))
+        if error:
+            return error
+        return JsonResponse({
+            'products': page.object_list,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+            'sync_cursor': sync_cursor,
+        })
+    
+    return JsonResponse({'products': list(products), 'sync_cursor': sync_cursor})
+
+
+def _stock_levels_delta(request):
+    """Products changed after the ``since`` cursor, oldest change first"""
+    from products.models import Product
+    
+    settled = _settled_key()
+    page, error = _cursor_page(
+        request,
+        Product.objects.values(*STOCK_FEED_FIELDS),
+        STOCK_FEED_ORDERING,
+        default_limit=500,
+        max_limit=5000,
+        cursor_param='since',
     )
+    if error:
+        return error
     
-    return JsonResponse({'products': list(products)})
+    paginator = KeysetPaginator(Product.objects.none(), STOCK_FEED_ORDERING)
+    if page.has_next or not page.object_list:
+        sync_cursor = page.next_cursor or request.GET['since']
+    else:
+        # Unsettled rows on the last page are sent again next time, but the
+        # cursor never moves back behind ``since``
+        last = page.object_list[-1]
+        since, _ = paginator.decode_cursor(request.GET['since'])
+        position = min((last['updated_at'], last['id']), (settled['updated_at'], settled['id']))
+        position = max(position, tuple(since))
+        sync_cursor = paginator.encode_cursor(dict(zip(('updated_at', 'id'), position)), 'next')
+    
+    return JsonResponse({
+        'changes': page.object_list,
+        'sync_cursor': sync_cursor,
+        'has_more': page.has_next,
+    })
+
+
+def _cursor_page(request, queryset, ordering, default_limit=50, max_limit=500, cursor_param='cursor'):
+    """Fetch one keyset page for a JSON API, or return an error response"""
+    try:
+        limit = min(max(int(request.GET.get('limit', default_limit)), 1), max_limit)
+    except ValueError:
+        return None, JsonResponse({'error': 'limit must be an integer'}, status=400)
+    
+    try:
+        page = KeysetPaginator(queryset, ordering, limit).page(request.GET.get(cursor_param) or None)
+    except InvalidCursor as e:
+        return None, JsonResponse({'error': str(e)}, status=400)
+    return page, None
+
+
+@login_required
+def stock_as_of_api(request):
+    """
+    Stock quantity and value at a past point in time.
+
+    ?date=YYYY-MM-DD (end of that day) or ?at=<ISO datetime>, optionally
+    narrowed with ?product=<id> or ?category=<id>.
+    """
+    from datetime import date
+    from django.utils import timezone
+    from django.utils.dateparse import parse_datetime
+    from .snapshots import stock_as_of
+    
+    try:
+        if request.GET.get('at'):
+            at = parse_datetime(request.GET['at'])
+            if at is None:
+                raise ValueError
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        else:
+            at = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Pass date=YYYY-MM-DD or at=<ISO datetime>'}, status=400)
+    
+    filters = {}
+    for key in ('product', 'category'):
+        if request.GET.get(key):
+            try:
+                filters[key] = uuid.UUID(request.GET[key])
+            except ValueError:
+                return JsonResponse({'error': f'{key} must be a UUID'}, status=400)
+    
+    result = stock_as_of(at, **filters)
+    return JsonResponse({
+        'at': result['at'].isoformat(),
+        'quantity': result['quantity'],
+        'value': str(result['value']),
+        'snapshot_date': result['snapshot_date'].isoformat() if result['snapshot_date'] else None,
+        'movements_applied': result['movements_applied'],
+    })
 
 
 @login_required
 def recent_movements_api(request):
     movements = StockMovement.objects.select_related('product').order_by('-created_at')[:10]
+    next_cursor = previous_cursor = None
+    
+    if 'cursor' in request.GET or 'limit' in request.GET:
+        page, error = _cursor_page(
+            request, StockMovement.objects.select_related('product'), ('-created_at', '-id'), default_limit=10
+        )
+        if error:
+            return error
+        movements = page.object_list
+        next_cursor, previous_cursor = page.next_cursor, page.previous_cursor
     
     data = {
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
         'movements': [
             {
                 'id': str(movement.id),
@@ -256,4 +526,49 @@ def recent_movements_api(request):
         ]
     }
     
-    return JsonResponse(data)
\ No newline at end of file
+    return JsonResponse(data)
+
+
+@login_required
+@require_POST
+def bulk_adjustment_api(request):
+    """Apply a JSON list of {sku, movement_type, quantity} lines"""
+    import json
+    from .services import StockLedgerService
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid JSON body'}, status=400)
+    
+    lines = payload.get('lines') if isinstance(payload, dict) else payload
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        return JsonResponse({'success': False, 'message': 'Expected a list of lines'}, status=400)
+    
+    try:
+        results = StockLedgerService.bulk_record_movements(
+            lines,
+            user=request.user,
+            notes=payload.get('notes') if isinstance(payload, dict) else None,
+            reference_number=payload.get('reference_number') if isinstance(payload, dict) else None,
+        )
+    except Exception:
+        # The lines share one transaction, so none of them were applied
+        logger.exception('Bulk stock adjustment failed')
+        return JsonResponse({
+            'success': False,
+            'applied': 0,
+            'failed': len(lines),
+            'results': [
+                {'line': index, 'status': 'error', 'error': 'Not applied: the adjustment could not be saved'}
+                for index in range(1, len(lines) + 1)
+            ],
+        })
+    applied = sum(1 for result in results if result['status'] == 'ok')
+    
+    return JsonResponse({
+        'success': True,
+        'applied': applied,
+        'failed': len(results) - applied,
+        'results': results,
+    })
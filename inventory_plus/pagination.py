@@ -0,0 +1,198 @@
+"""
+Keyset (cursor) pagination shared by list views and JSON APIs
+"""
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import base64
+import datetime
+import json
+import uuid
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {'uuid': str(value)}
+    return value
+
+
+def _decode_value(value):
+    """Undo _encode_value; anything but a scalar or a well-formed wrapper is an InvalidCursor"""
+    if isinstance(value, dict):
+        if set(value) == {'dt'} and isinstance(value['dt'], str):
+            decoded = parse_datetime(value['dt'])
+            if decoded is None or timezone.is_naive(decoded):
+                raise InvalidCursor('Invalid pagination cursor')
+            return decoded
+        if set(value) == {'uuid'} and isinstance(value['uuid'], str):
+            return uuid.UUID(value['uuid'])
+        raise InvalidCursor('Invalid pagination cursor')
+    if value is None or isinstance(value, list):
+        raise InvalidCursor('Invalid pagination cursor')
+    return value
+
+
+class CursorPage:
+    """One page of results plus opaque tokens for its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on a unique ordering such as ('-created_at', '-id').
+
+    Each page is fetched with a WHERE on the ordering key of the last row
+    seen plus LIMIT, so no COUNT(*) or OFFSET scan is needed and a matching
+    composite index serves every page as a single range scan.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, obj, direction):
+        if isinstance(obj, dict):
+            values = [_encode_value(obj[field]) for field in self.fields]
+        else:
+            values = [_encode_value(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps({'v': values, 'd': direction}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [_decode_value(value) for value in payload['v']]
+            direction = payload['d']
+            if len(values) != len(self.fields) or direction not in ('next', 'prev'):
+                raise InvalidCursor('Invalid pagination cursor')
+            values = [self._clean_value(field, value) for field, value in zip(self.fields, values)]
+        except InvalidCursor:
+            raise
+        except (ValueError, KeyError, TypeError, AttributeError, ValidationError):
+            raise InvalidCursor('Invalid pagination cursor')
+        return values, direction
+
+    def _clean_value(self, name, value):
+        """Check a decoded value against the model field it is compared with"""
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations: only the scalar check in _decode_value applies
+            return value
+        expected = {
+            'DateTimeField': datetime.datetime,
+            'UUIDField': uuid.UUID,
+        }.get(field.get_internal_type())
+        if expected is not None and not isinstance(value, expected):
+            raise InvalidCursor('Invalid pagination cursor')
+        value = field.to_python(value)
+        if value is None:
+            raise InvalidCursor('Invalid pagination cursor')
+        return value
+
+    def _after(self, values, reverse):
+        """Q matching rows strictly after ``values`` in the (possibly reversed) ordering"""
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            name = self.fields[position]
+            term = Q(**{f'{name}__{lookup}': values[position]})
+            for previous in range(position):
+                term &= Q(**{self.fields[previous]: values[previous]})
+            condition |= term
+        return condition
+
+    def page(self, token=None):
+        """Get the page that follows (or precedes) the given cursor token"""
+        ordering = self.ordering
+        queryset = self.queryset
+        reverse = False
+
+        if token:
+            values, direction = self.decode_cursor(token)
+            reverse = direction == 'prev'
+            queryset = queryset.filter(self._after(values, reverse))
+            if reverse:
+                ordering = tuple(
+                    field[1:] if field.startswith('-') else f'-{field}' for field in ordering
+                )
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+
+        if reverse:
+            next_cursor = self.encode_cursor(rows[-1], 'next')
+            previous_cursor = self.encode_cursor(rows[0], 'prev') if has_more else None
+        else:
+            next_cursor = self.encode_cursor(rows[-1], 'next') if has_more else None
+            previous_cursor = self.encode_cursor(rows[0], 'prev') if token else None
+
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that switches to keyset pagination when the request
+    carries ``?cursor=`` or ``?pagination=cursor``. Page-number pagination
+    stays available for everything else.
+    """
+
+    keyset_ordering = None
+
+    def use_keyset_pagination(self):
+        return bool(self.keyset_ordering) and (
+            'cursor' in self.request.GET or self.request.GET.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor') or None)
+        except InvalidCursor:
+            # Stale or hand-edited links start over at the first page
+            page = paginator.page()
+        self.cursor_page = page
+        return (None, None, page.object_list, False)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_page'] = getattr(self, 'cursor_page', None)
+        return context
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+from decimal import Decimal
 from pathlib import Path
 import os
 from dotenv import load_dotenv
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
     'suppliers',         # Supplier management
     'inventory',         # Stock movements and inventory tracking
     'notifications',     # Notification system
+    'inventory_plus',    # Shared pagination, thumbnails and template tags
 ]
 
 MIDDLEWARE = [
@@ -136,6 +138,9 @@ DEFAULT_CURRENCY = 'SAR'
 CURRENCY_SYMBOL = 'SAR'
 CURRENCY_NAME = 'Saudi Riyal'
 
+# VAT applied to inventory transaction totals
+TAX_RATE = Decimal(os.getenv('TAX_RATE', '0.15'))
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
@@ -150,6 +155,10 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rejected-row files from catalog imports; kept out of MEDIA_ROOT and only
+# downloadable by the user who ran the import
+IMPORT_ERRORS_ROOT = BASE_DIR / 'private' / 'imports'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -175,6 +184,22 @@ SITE_URL = 'http://127.0.0.1:8000'
 MANAGER_EMAIL = os.getenv('MANAGER_EMAIL', 'manager@company.com')
 LOW_STOCK_THRESHOLD = 10
 
+# How often each generated stock notification may repeat for a product:
+# 'daily' (calendar day), 'hourly' (clock hour) or 'rolling' (24 hours since the last one)
+NOTIFICATION_DEDUP_WINDOWS = {
+    'out_of_stock': 'daily',
+    'low_stock': 'daily',
+    'reorder_needed': 'daily',
+    'expiry_soon': 'daily',
+    'expired': 'daily',
+}
+
+# Notification emails are collected per recipient and sent as one digest once the oldest
+# has waited EMAIL_DIGEST_MINUTES (0 emails every notification on its own); notifications
+# with one of EMAIL_IMMEDIATE_PRIORITIES are always emailed right away
+EMAIL_DIGEST_MINUTES = int(os.getenv('EMAIL_DIGEST_MINUTES', '60'))
+EMAIL_IMMEDIATE_PRIORITIES = ['urgent']
+
 # Login/Logout URLs
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'dashboard'
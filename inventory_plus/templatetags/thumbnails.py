@@ -0,0 +1,10 @@
+from django import template
+from inventory_plus.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(image, variant='list'):
+    """Usage: {{ product.image|thumbnail:'card' }}"""
+    return thumbnail_url(image, variant)
@@ -0,0 +1,119 @@
+"""
+Pre-generated image thumbnails stored under content-hashed, immutable names
+"""
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+import hashlib
+import io
+import json
+
+
+# variant -> bounding box (width, height), sized for 2x displays
+VARIANTS = {
+    'list': (100, 100),
+    'card': (600, 400),
+    'detail': (1200, 1200),
+}
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_QUALITY = 82
+
+# Manifests never change once written, so found ones are cached for a day;
+# a missing one is re-checked after a minute, once the worker may have run
+MANIFEST_CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_CACHE_TIMEOUT = 60
+
+
+def _source_key(source_name):
+    return hashlib.sha1(source_name.encode()).hexdigest()
+
+
+def manifest_name(source_name):
+    """Storage path of the manifest that maps a source image to its variants"""
+    return f'{THUMBNAIL_DIR}/sources/{_source_key(source_name)}.json'
+
+
+def _cache_key(source_name):
+    return f'thumbnail-manifest:{_source_key(source_name)}'
+
+
+def variant_name(digest, variant):
+    width, height = VARIANTS[variant]
+    return f'{THUMBNAIL_DIR}/{digest[:24]}-{variant}-{width}x{height}.webp'
+
+
+def generate_variants(source_name, force=False):
+    """
+    Render every variant of one stored image and write its manifest.
+
+    Runs in the generate_thumbnails worker processes, so it touches
+    storage and the cache only, never the database. Variant names derive from the source bytes, so identical
+    uploads share files and a name never points at different content.
+    """
+    from PIL import Image, ImageOps
+
+    manifest_path = manifest_name(source_name)
+    if not force and default_storage.exists(manifest_path):
+        return None
+
+    with default_storage.open(source_name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    manifest = {'source': source_name, 'variants': {}}
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for variant, size in VARIANTS.items():
+            name = variant_name(digest, variant)
+            if not default_storage.exists(name):
+                thumbnail = image.copy()
+                thumbnail.thumbnail(size, Image.LANCZOS)
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            manifest['variants'][variant] = name
+
+    if default_storage.exists(manifest_path):
+        default_storage.delete(manifest_path)
+    default_storage.save(manifest_path, ContentFile(json.dumps(manifest).encode()))
+    cache.set(_cache_key(source_name), manifest['variants'], MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def pending_sources(source_names):
+    """The images among ``source_names`` that have no manifest yet, from one directory listing"""
+    try:
+        _, files = default_storage.listdir(f'{THUMBNAIL_DIR}/sources')
+    except FileNotFoundError:
+        files = []
+    done = set(files)
+    return [name for name in source_names if f'{_source_key(name)}.json' not in done]
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def thumbnail_url(fieldfile, variant):
+    """URL of a pre-generated variant, or of the original until it exists"""
+    if not fieldfile:
+        return ''
+    if variant not in VARIANTS:
+        raise ValueError(f'Unknown thumbnail variant "{variant}"')
+
+    key = _cache_key(fieldfile.name)
+    variants = cache.get(key)
+    if variants is None:
+        try:
+            with default_storage.open(manifest_name(fieldfile.name), 'rb') as stream:
+                variants = json.loads(stream.read())['variants']
+        except (OSError, ValueError, KeyError):
+            # An empty dict caches the miss, so pages don't stat storage per image
+            variants = {}
+        cache.set(key, variants, MANIFEST_CACHE_TIMEOUT if variants else MISSING_CACHE_TIMEOUT)
+    if variant not in variants:
+        return fieldfile.url
+    return default_storage.url(variants[variant])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationTemplate
+from .models import EmailOutbox, Notification, NotificationTemplate
 
 
 @admin.register(Notification)
@@ -65,17 +65,11 @@ class NotificationAdmin(admin.ModelAdmin):
     mark_as_unread.short_description = 'Mark selected notifications as unread'
     
     def send_email_notifications(self, request, queryset):
-        from .services import NotificationService
-        count = 0
-        for notification in queryset.filter(is_email_sent=False):
-            try:
-                NotificationService.send_email_notification(notification)
-                count += 1
-            except Exception as e:
-                self.message_user(request, f'Error sending email for {notification}: {e}', level='ERROR')
+        from .services import EmailQueue
+        queued = EmailQueue.enqueue(list(queryset.filter(is_email_sent=False).only('id')))
         
-        if count:
-            self.message_user(request, f'{count} email notifications sent successfully.')
+        if queued:
+            self.message_user(request, f'{queued} email notifications queued for sending.')
     send_email_notifications.short_description = 'Send email notifications'
     
     def delete_selected_notifications(self, request, queryset):
@@ -168,4 +162,28 @@ class NotificationTemplateAdmin(admin.ModelAdmin):
     )
     
     def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject', 'priority', 'status', 'attempts',
+        'next_attempt_at', 'sent_at', 'created_at'
+    )
+    list_filter = ('status', 'priority', 'created_at')
+    search_fields = ('subject', 'last_error')
+    readonly_fields = (
+        'notification', 'subject', 'body', 'html_body', 'from_email', 'recipients',
+        'priority', 'priority_rank', 'status', 'attempts', 'next_attempt_at',
+        'claimed_at', 'sent_at', 'last_error', 'created_at'
+    )
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status__in=['sent', 'sending']).update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} emails queued for another attempt.')
+    retry_now.short_description = 'Retry selected emails now'
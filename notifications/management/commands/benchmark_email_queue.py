@@ -0,0 +1,186 @@
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from notifications.models import EmailOutbox, Notification
+from notifications.services import EmailQueue
+import random
+import socketserver
+import threading
+import time
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server that accepts and discards every message"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        # Stands in for TCP, TLS and authentication round trips to a real relay
+        time.sleep(server.handshake_delay)
+        self.reply('220 localhost SMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.reply('250 OK queued')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the email queue worker against one send_mail() connection per notification'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--emails',
+            type=int,
+            default=500,
+            help='Notifications to email (default: 500)',
+        )
+        parser.add_argument(
+            '--handshake-ms',
+            type=float,
+            default=50,
+            help='Simulated connection setup latency of the SMTP stand-in (default: 50)',
+        )
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=3,
+            help='Admins and managers every alert goes to (default: 3)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EmailQueue.BATCH_SIZE,
+            help=f'Emails per worker batch (default: {EmailQueue.BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        server = SMTPStandIn(options['handshake_ms'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        smtp_settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=server.server_address[1],
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        )
+        recipients = [f'manager{i}@example.com' for i in range(options['recipients'])]
+
+        try:
+            # Everything runs inside a transaction that is rolled back, so seeded rows never persist
+            with smtp_settings, transaction.atomic():
+                notifications = self.seed_notifications(options['emails'])
+
+                start_time = time.perf_counter()
+                for notification in notifications:
+                    subject, body, html_body = EmailQueue.render(notification)
+                    send_mail(subject, body, None, recipients, html_message=html_body)
+                legacy_seconds = time.perf_counter() - start_time
+                legacy_connections = server.connections
+
+                start_time = time.perf_counter()
+                queued = EmailQueue.enqueue(notifications, recipients, immediate=True)
+                enqueue_seconds = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                sent, failed = EmailQueue.process(batch_size=options['batch_size'])
+                worker_seconds = time.perf_counter() - start_time
+                worker_connections = server.connections - legacy_connections
+
+                first_low = EmailOutbox.objects.filter(status='sent').exclude(priority='urgent').order_by('sent_at').first()
+                late_urgent = first_low and EmailOutbox.objects.filter(
+                    status='sent', priority='urgent', sent_at__gt=first_low.sent_at
+                ).count()
+
+                # Digest mode: urgent alerts still go out one by one, the rest in one email per recipient
+                Notification.objects.filter(pk__in=[notification.pk for notification in notifications]).update(
+                    is_email_sent=False
+                )
+                connections_before = server.connections
+                messages_before = server.messages
+                with override_settings(EMAIL_DIGEST_MINUTES=60, EMAIL_IMMEDIATE_PRIORITIES=['urgent']):
+                    start_time = time.perf_counter()
+                    EmailQueue.enqueue(notifications, recipients)
+                    digests = EmailQueue.build_digests(flush=True)
+                    digest_sent, _ = EmailQueue.process(batch_size=options['batch_size'])
+                    digest_seconds = time.perf_counter() - start_time
+
+                self.stdout.write('\n' + '='*50)
+                self.stdout.write(self.style.SUCCESS('📊 EMAIL QUEUE BENCHMARK'))
+                self.stdout.write('='*50)
+                self.stdout.write(
+                    f'Alerts: {len(notifications)} to {len(recipients)} recipients, '
+                    f'SMTP setup latency {options["handshake_ms"]:.0f} ms'
+                )
+                self.stdout.write(
+                    f'send_mail() per notification: {legacy_seconds:.2f} seconds, '
+                    f'{len(notifications) / max(legacy_seconds, 1e-9):.0f} emails/s, {legacy_connections} connections'
+                )
+                self.stdout.write(f'Queueing (what a request now waits for): {enqueue_seconds:.2f} seconds for {queued} emails')
+                self.stdout.write(
+                    f'Queue worker: {worker_seconds:.2f} seconds, '
+                    f'{sent / max(worker_seconds, 1e-9):.0f} emails/s, {worker_connections} connections, '
+                    f'{sent} sent, {failed} failed'
+                )
+                self.stdout.write(f'Speedup: {legacy_seconds / max(worker_seconds, 1e-9):.1f}x')
+                self.stdout.write(
+                    f'Digest mode: {digest_seconds:.2f} seconds, {digest_sent} emails '
+                    f'({digest_sent - digests} urgent sent immediately, {digests} digests), '
+                    f'{server.messages - messages_before} SMTP messages, '
+                    f'{server.connections - connections_before} connections'
+                )
+                if late_urgent:
+                    self.stdout.write(self.style.ERROR(f'❌ {late_urgent} urgent emails sent after lower priorities'))
+                else:
+                    self.stdout.write(self.style.SUCCESS('✅ Urgent emails went out first'))
+
+                transaction.set_rollback(True)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def seed_notifications(self, count):
+        self.stdout.write(f'🌱 Seeding {count} temporary notifications...')
+        priorities = [priority for priority, _ in Notification.PRIORITY_CHOICES]
+        notifications = [
+            Notification(
+                type='system',
+                title=f'Email benchmark {i}',
+                message='Created by benchmark_email_queue',
+                priority=random.choice(priorities),
+            )
+            for i in range(count)
+        ]
+        return Notification.objects.bulk_create(notifications)
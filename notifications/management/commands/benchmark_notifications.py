@@ -0,0 +1,168 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from notifications.models import Notification
+from notifications.services import StockNotificationGenerator
+from products.models import Category, Product
+import random
+import time
+import uuid
+
+
+class QueryCounter:
+    """Execute wrapper counting statements (the debug query log is capped)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the set-based stock notification generator against the per-product create() loops'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=100000,
+            help='Temporary products to add to the catalog for the run (default: 100000)',
+        )
+        parser.add_argument(
+            '--legacy-sample',
+            type=int,
+            default=2000,
+            help='Notifications to create through the old loop to project its cost (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back, so seeded rows never persist
+        with transaction.atomic():
+            self.seed_products(options['products'])
+            catalog = Product.objects.filter(is_active=True).count()
+
+            with transaction.atomic():
+                legacy_queries = QueryCounter()
+                with connection.execute_wrapper(legacy_queries):
+                    start_time = time.perf_counter()
+                    legacy_created = self.legacy_loop(options['legacy_sample'])
+                    legacy_seconds = time.perf_counter() - start_time
+                transaction.set_rollback(True)
+            per_notification_ms = legacy_seconds * 1000 / max(legacy_created, 1)
+
+            engine_queries = QueryCounter()
+            with connection.execute_wrapper(engine_queries):
+                start_time = time.perf_counter()
+                created = StockNotificationGenerator.generate()
+                engine_seconds = time.perf_counter() - start_time
+
+            # A second pass finds every notification inside the dedup window
+            start_time = time.perf_counter()
+            repeated = StockNotificationGenerator.generate()
+            repeat_seconds = time.perf_counter() - start_time
+
+            projected_seconds = per_notification_ms * len(created) / 1000
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 STOCK NOTIFICATION BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Active products: {catalog}')
+            self.stdout.write(
+                f'Per-product loop: {per_notification_ms:.2f} ms/notification over {legacy_created} notifications '
+                f'({legacy_queries.count} queries), projected {projected_seconds:.1f} seconds for all'
+            )
+            self.stdout.write(
+                f'Set-based generator: {engine_seconds:.2f} seconds, '
+                f'{len(created)} notifications, {engine_queries.count} queries'
+            )
+            for notification_type, count in StockNotificationGenerator.count_by_type(created).items():
+                self.stdout.write(f'   {notification_type}: {count}')
+            self.stdout.write(f'Repeat run (dedup): {repeat_seconds:.2f} seconds, {len(repeated)} notifications')
+            self.stdout.write(f'Speedup: {projected_seconds / max(engine_seconds, 1e-9):.1f}x')
+
+            transaction.set_rollback(True)
+
+    def legacy_loop(self, limit):
+        """The per-product loop the entry points used before, stopped after ``limit`` notifications"""
+        today = timezone.now().date()
+        since = timezone.now() - timedelta(hours=24)
+        created = 0
+
+        low_stock_products = Product.objects.filter(
+            is_active=True,
+            stock_status__in=Product.LOW_STOCK_STATUSES
+        ).exclude(
+            notifications__type__in=['low_stock', 'out_of_stock'],
+            notifications__created_at__gte=since
+        )
+        for product in low_stock_products[:limit]:
+            notification_type = 'out_of_stock' if product.stock_quantity == 0 else 'low_stock'
+            Notification.objects.create(
+                type=notification_type,
+                title=f'Stock Alert: {product.name}',
+                message=f'Product "{product.name}" (SKU: {product.sku}), category {product.category.name}. '
+                        f'Current stock: {product.stock_quantity}, Minimum: {product.minimum_stock}',
+                product=product,
+                priority='urgent' if notification_type == 'out_of_stock' else 'high',
+                extra_data={
+                    'current_stock': product.stock_quantity,
+                    'minimum_stock': product.minimum_stock,
+                    'category': product.category.name,
+                    'unit_price': str(product.unit_price)
+                }
+            )
+            created += 1
+
+        expiring_products = Product.objects.filter(
+            is_active=True,
+            has_expiry=True,
+            expiry_date__isnull=False,
+            expiry_date__lte=today + timedelta(days=7)
+        ).exclude(
+            notifications__type__in=['expiry_soon', 'expired'],
+            notifications__created_at__gte=since
+        )
+        for product in expiring_products[:max(limit - created, 0)]:
+            days_until_expiry = (product.expiry_date - today).days
+            Notification.objects.create(
+                type='expired' if days_until_expiry < 0 else 'expiry_soon',
+                title=f'Expiry Alert: {product.name}',
+                message=f'Product "{product.name}" (SKU: {product.sku}), category {product.category.name}, '
+                        f'expires on {product.expiry_date}.',
+                product=product,
+                priority='urgent' if days_until_expiry <= 3 else 'high',
+                extra_data={
+                    'expiry_date': str(product.expiry_date),
+                    'days_until_expiry': days_until_expiry,
+                    'current_stock': product.stock_quantity
+                }
+            )
+            created += 1
+        return created
+
+    def seed_products(self, count):
+        self.stdout.write(f'🌱 Seeding {count} temporary products...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        today = timezone.localdate()
+
+        batch_size = 5000
+        for offset in range(0, count, batch_size):
+            products = []
+            for i in range(min(batch_size, count - offset)):
+                has_expiry = random.random() < 0.3
+                products.append(Product(
+                    id=uuid.uuid4(),
+                    name=f'Notification benchmark {offset + i}',
+                    sku=f'NB-{uuid.uuid4().hex[:12].upper()}',
+                    category=category,
+                    unit_price=1,
+                    stock_quantity=random.choice((0, random.randint(1, 30), random.randint(31, 1000))),
+                    has_expiry=has_expiry,
+                    expiry_date=today + timedelta(days=random.randint(-10, 120)) if has_expiry else None,
+                ))
+            Product.objects.bulk_create(products)
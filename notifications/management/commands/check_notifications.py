@@ -4,7 +4,7 @@ from notifications.models import Notification
 
 
 class Command(BaseCommand):
-    help = 'Check and create notifications for inventory alerts'
+    help = 'Full scan for inventory alerts (safety net; stock changes are checked as they commit)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,31 +19,31 @@ class Command(BaseCommand):
         self.stdout.write('Starting notification checks...')
         
         notification_type = options['type']
+        counts = {}
         
         if notification_type in ['low_stock', 'all']:
             self.stdout.write('\n--- Checking Low Stock Alerts ---')
-            low_stock_count = NotificationService.check_low_stock_alerts()
-            self.stdout.write(f'Low stock notifications created: {low_stock_count}')
+            counts['low_stock'] = NotificationService.check_low_stock_alerts()
+            self.stdout.write(f'Low stock notifications created: {counts["low_stock"]}')
         
         if notification_type in ['expiry', 'all']:
             self.stdout.write('\n--- Checking Expiry Alerts ---')
-            expiry_count = NotificationService.check_expiry_alerts()
-            self.stdout.write(f'Expiry notifications created: {expiry_count}')
+            counts['expiry'] = NotificationService.check_expiry_alerts()
+            self.stdout.write(f'Expiry notifications created: {counts["expiry"]}')
         
         if notification_type in ['reorder', 'all']:
             self.stdout.write('\n--- Checking Reorder Alerts ---')
-            reorder_count = NotificationService.check_reorder_alerts()
-            self.stdout.write(f'Reorder notifications created: {reorder_count}')
+            counts['reorder'] = NotificationService.check_reorder_alerts()
+            self.stdout.write(f'Reorder notifications created: {counts["reorder"]}')
         
-        # Summary
+        # Summary of the checks above (running them again would only find duplicates)
         if notification_type == 'all':
-            total_count = NotificationService.run_all_checks()
             self.stdout.write('\n' + '='*50)
             self.stdout.write('SUMMARY:')
-            self.stdout.write(f'Low stock alerts: {total_count["low_stock"]}')
-            self.stdout.write(f'Expiry alerts: {total_count["expiry"]}')
-            self.stdout.write(f'Reorder alerts: {total_count["reorder"]}')
-            self.stdout.write(f'Total notifications: {total_count["total"]}')
+            self.stdout.write(f'Low stock alerts: {counts["low_stock"]}')
+            self.stdout.write(f'Expiry alerts: {counts["expiry"]}')
+            self.stdout.write(f'Reorder alerts: {counts["reorder"]}')
+            self.stdout.write(f'Total notifications: {sum(counts.values())}')
         
         # Show recent notifications
         recent_notifications = Notification.objects.all().order_by('-created_at')[:5]
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from notifications.services import EmailQueue
+import time
+
+
+class Command(BaseCommand):
+    help = 'Email queue worker: send queued notification emails, urgent first, retrying failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EmailQueue.BATCH_SIZE,
+            help=f'Emails sent per SMTP connection (default: {EmailQueue.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send what is due now and exit instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📮 Email queue worker started'))
+
+        try:
+            while True:
+                sent, failed = EmailQueue.process(batch_size=options['batch_size'])
+                if sent or failed:
+                    stamp = timezone.localtime().strftime('%H:%M:%S')
+                    self.stdout.write(f'[{stamp}] 📧 Sent {sent}, failed {failed}')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Email queue worker stopped'))
@@ -1,12 +1,10 @@
 from django.core.management.base import BaseCommand
-from inventory.services import NotificationService
+from notifications.services import EmailQueue
 from notifications.models import Notification
-from django.contrib.auth.models import User
-from accounts.models import UserProfile
 
 
 class Command(BaseCommand):
-    help = 'Send pending email notifications'
+    help = 'Queue emails for pending notifications and send everything due in the email queue'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -43,32 +41,18 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('No notifications to send'))
             return
         
-        # Send notifications
-        sent_count = 0
-        failed_count = 0
-        
-        for notification in notifications:
-            try:
-                result = NotificationService.send_email_notification(notification)
-                if result:
-                    sent_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'✓ Sent: {notification.title}')
-                    )
-                else:
-                    failed_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(f'✗ Failed: {notification.title}')
-                    )
-            except Exception as e:
-                failed_count += 1
-                self.stdout.write(
-                    self.style.ERROR(f'✗ Error sending {notification.title}: {e}')
-                )
+        # Queue the emails and send everything due through the email queue
+        queued = EmailQueue.enqueue(list(notifications.only('id')))
+        self.stdout.write(f'Queued {queued} emails')
+        digests = EmailQueue.build_digests(flush=True)
+        if digests:
+            self.stdout.write(f'Built {digests} digest emails')
+        sent_count, failed_count = EmailQueue.process()
         
         # Summary
         self.stdout.write('\n' + '='*50)
         self.stdout.write(f'Total notifications: {count}')
+        self.stdout.write(f'Emails queued: {queued}')
         self.stdout.write(f'Successfully sent: {sent_count}')
         self.stdout.write(f'Failed: {failed_count}')
         
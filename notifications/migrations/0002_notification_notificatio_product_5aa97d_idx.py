@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        ('products', '0005_product_products_updated_at_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['product', 'type', 'created_at'], name='notificatio_product_5aa97d_idx'),
+        ),
+    ]
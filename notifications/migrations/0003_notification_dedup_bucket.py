@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_notificatio_product_5aa97d_idx'),
+        ('products', '0005_product_products_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedup_bucket',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='notification',
+            unique_together={('type', 'dedup_bucket', 'product')},
+        ),
+    ]
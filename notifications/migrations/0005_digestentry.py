@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email', models.ForeignKey(blank=True, help_text='Digest email this entry went out in (empty while waiting)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='digest_entries', to='notifications.emailoutbox')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_entries', to='notifications.notification')),
+            ],
+            options={
+                'verbose_name_plural': 'Digest entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['email', 'recipient', 'created_at'], name='notificatio_email_i_a2a838_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_digestentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='claim_token',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 import uuid
@@ -65,13 +67,21 @@ class Notification(models.Model):
     
     # Additional data (JSON field for extra information)
     extra_data = models.JSONField(blank=True, null=True, help_text="Additional notification data")
+    
+    # Period a generated stock notification covers (see StockNotificationGenerator.dedup_bucket);
+    # empty for notifications created any other way
+    dedup_bucket = models.CharField(max_length=32, blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        # At most one generated notification per product, type and dedup period
+        unique_together = ['type', 'dedup_bucket', 'product']
         indexes = [
             models.Index(fields=['type', 'is_read']),
             models.Index(fields=['priority', 'created_at']),
             models.Index(fields=['user', 'is_read']),
+            # Recent-notification lookups when generating stock notifications
+            models.Index(fields=['product', 'type', 'created_at']),
         ]
 
     def __str__(self):
@@ -161,6 +171,94 @@ class Notification(models.Model):
         )
 
 
+class EmailOutbox(models.Model):
+    """Rendered notification email waiting for (or sent by) the email queue worker"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    # Queue order: urgent first
+    PRIORITY_RANKS = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+    
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='emails'
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    priority = models.CharField(max_length=10, choices=Notification.PRIORITY_CHOICES, default='medium')
+    priority_rank = models.PositiveSmallIntegerField(default=2)
+    
+    # Delivery state
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    # Identifies the worker batch holding the claim; claimed_at is its heartbeat
+    claim_token = models.UUIDField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['priority_rank', 'next_attempt_at']
+        verbose_name = 'Queued email'
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            # The worker's claim query
+            models.Index(fields=['status', 'priority_rank', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
+
+    def save(self, *args, **kwargs):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 2)
+        super().save(*args, **kwargs)
+
+
+class DigestEntry(models.Model):
+    """Notification waiting to go out in a recipient's next digest email"""
+    
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='digest_entries'
+    )
+    recipient = models.EmailField()
+    email = models.ForeignKey(
+        EmailOutbox,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='digest_entries',
+        help_text="Digest email this entry went out in (empty while waiting)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'Digest entries'
+        indexes = [
+            # Waiting entries per recipient and the oldest of each
+            models.Index(fields=['email', 'recipient', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.notification}"
+
+
 class NotificationTemplate(models.Model):
     """Template for notification messages"""
     
@@ -213,4 +311,23 @@ class NotificationTemplate(models.Model):
             from .services import NotificationService
             NotificationService.send_email_notification(notification)
         
-        return notification
\ No newline at end of file
+        return notification
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_recipients_for_user(sender, instance, **kwargs):
+    """Drop cached email recipients when a user's email or active flag changes"""
+    from .recipients import user_changed
+    if kwargs.get('signal') is post_delete:
+        user_changed(instance.pk, '', None)
+    else:
+        user_changed(instance.pk, instance.email, instance.is_active)
+
+
+@receiver(post_save, sender='accounts.UserProfile')
+@receiver(post_delete, sender='accounts.UserProfile')
+def refresh_recipients_for_profile(sender, instance, **kwargs):
+    """Drop cached email recipients when a user's role changes"""
+    from .recipients import role_changed
+    role_changed(instance.user_id, None if kwargs.get('signal') is post_delete else instance.role)
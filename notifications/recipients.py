@@ -0,0 +1,145 @@
+"""
+Cached resolution of notification email recipients from user roles and stock alert settings
+"""
+from django.core.cache import cache
+
+RECIPIENT_CACHE_KEY = 'notification-recipients'
+
+# Signal handlers drop the cache as soon as a role, email or active flag
+# changes; the timeout covers queryset.update() calls, which send no
+# signals, and other processes when the cache backend is per process
+RECIPIENT_CACHE_TIMEOUT = 300
+
+# Who gets notifications that name no recipients of their own
+DEFAULT_ROLES = ('admin', 'manager')
+
+# Alert ids per IN (...) lookup; keeps statements under SQLite's parameter limit
+LOOKUP_BATCH = 900
+
+
+def load_directory():
+    """
+    Every user with an email address, read in one query.
+
+    Returns {'users': {user_id: (email, is_active, role)}, 'roles': {role:
+    [emails of active users]}, 'retired': {emails only inactive users
+    have}}. Emails in 'retired' are compared lower-cased.
+    """
+    from django.contrib.auth.models import User
+
+    users = {}
+    roles = {}
+    active = set()
+    inactive = set()
+    for user_id, email, is_active, role in User.objects.exclude(email='').values_list(
+        'id', 'email', 'is_active', 'profile__role'
+    ):
+        users[user_id] = (email, is_active, role)
+        if is_active:
+            roles.setdefault(role, set()).add(email)
+            active.add(email.lower())
+        else:
+            inactive.add(email.lower())
+    return {
+        'users': users,
+        'roles': {role: sorted(emails) for role, emails in roles.items()},
+        'retired': inactive - active,
+    }
+
+
+def get_directory():
+    directory = cache.get(RECIPIENT_CACHE_KEY)
+    if directory is None:
+        directory = load_directory()
+        cache.set(RECIPIENT_CACHE_KEY, directory, RECIPIENT_CACHE_TIMEOUT)
+    return directory
+
+
+def invalidate():
+    cache.delete(RECIPIENT_CACHE_KEY)
+
+
+def role_emails(roles, directory=None):
+    """Sorted emails of the active users holding any of ``roles``"""
+    directory = directory or get_directory()
+    emails = set()
+    for role in roles:
+        emails.update(directory['roles'].get(role, ()))
+    return sorted(emails)
+
+
+def default_recipients(directory=None):
+    return role_emails(DEFAULT_ROLES, directory)
+
+
+def user_emails(user_ids, directory=None):
+    """Sorted emails of the active users among ``user_ids``"""
+    directory = directory or get_directory()
+    emails = set()
+    for user_id in user_ids:
+        entry = directory['users'].get(user_id)
+        if entry and entry[1]:
+            emails.add(entry[0])
+    return sorted(emails)
+
+
+def alert_recipients(alert_ids, directory=None):
+    """
+    Recipients of each StockAlert as {str(alert_id): [emails]}.
+
+    An alert goes to its notify_users plus every active user with one of
+    its notify_roles, or to the default roles when it names neither.
+    Alerts with email_notifications off map to None; deleted alerts are
+    left out. Two queries per LOOKUP_BATCH alerts.
+    """
+    from inventory.models import StockAlert
+
+    directory = directory or get_directory()
+    alert_ids = list(dict.fromkeys(alert_ids))
+    through = StockAlert.notify_users.through
+    resolved = {}
+    for offset in range(0, len(alert_ids), LOOKUP_BATCH):
+        chunk = alert_ids[offset:offset + LOOKUP_BATCH]
+        users = {}
+        for alert_id, user_id in through.objects.filter(stockalert_id__in=chunk).values_list(
+            'stockalert_id', 'user_id'
+        ):
+            users.setdefault(alert_id, []).append(user_id)
+        for alert_id, email_notifications, notify_roles in StockAlert.objects.filter(pk__in=chunk).values_list(
+            'id', 'email_notifications', 'notify_roles'
+        ):
+            if not email_notifications:
+                resolved[str(alert_id)] = None
+            elif alert_id in users or notify_roles:
+                resolved[str(alert_id)] = sorted(
+                    set(user_emails(users.get(alert_id, ()), directory))
+                    | set(role_emails(notify_roles or (), directory))
+                )
+            else:
+                resolved[str(alert_id)] = default_recipients(directory)
+    return resolved
+
+
+def retired_emails():
+    """Lower-cased addresses that only belong to deactivated users; mail to them is dropped"""
+    return get_directory()['retired']
+
+
+def user_changed(user_id, email, is_active):
+    """Drop the cache if a saved user's email or active flag differs from the cached one"""
+    directory = cache.get(RECIPIENT_CACHE_KEY)
+    if directory is None:
+        return
+    entry = directory['users'].get(user_id)
+    if (entry[:2] if entry else ('', None)) != ((email, is_active) if email else ('', None)):
+        invalidate()
+
+
+def role_changed(user_id, role):
+    """Drop the cache if a saved profile's role differs from the cached one"""
+    directory = cache.get(RECIPIENT_CACHE_KEY)
+    if directory is None:
+        return
+    entry = directory['users'].get(user_id)
+    if entry and entry[2] != role:
+        invalidate()
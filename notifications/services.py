@@ -1,7 +1,8 @@
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
 from .models import Notification, NotificationTemplate
 import logging
 
@@ -26,154 +27,24 @@ class NotificationService:
     
     @staticmethod
     def send_email_notification(notification):
-        """Send email notification"""
-        try:
-            # Determine recipients
-            recipients = []
-            
-            if notification.user:
-                recipients = [notification.user.email]
-            else:
-                # Send to all admin users
-                from accounts.models import UserProfile
-                admin_users = User.objects.filter(
-                    profile__role__in=['admin', 'manager'],
-                    email__isnull=False
-                ).exclude(email='')
-                recipients = [user.email for user in admin_users]
-            
-            if not recipients:
-                logger.warning(f"No recipients found for notification {notification.id}")
-                return False
-            
-            # Render email content
-            context = {
-                'notification': notification,
-                'site_name': 'Inventory Plus',
-            }
-            
-            html_message = render_to_string('emails/notification_email.html', context)
-            plain_message = f"""
-{notification.title}
-
-{notification.message}
-
-Priority: {notification.get_priority_display()}
-Type: {notification.get_type_display()}
-Created: {notification.created_at}
-
----
-Inventory Plus System
-"""
-            
-            # Send email
-            send_mail(
-                subject=f"[Inventory Plus] {notification.title}",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=recipients,
-                html_message=html_message,
-                fail_silently=False,
-            )
-            
-            # Mark as sent
-            notification.send_email()
-            logger.info(f"Email sent for notification {notification.id} to {len(recipients)} recipients")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email for notification {notification.id}: {str(e)}")
-            return False
+        """Queue the notification email for the email worker"""
+        return bool(EmailQueue.enqueue([notification]))
     
     @staticmethod
     def check_low_stock_alerts():
-        """Check for low stock products and create notifications"""
-        from products.models import Product
-        from django.db import models
-        from django.utils import timezone
+        """Check for low and out-of-stock products and create notifications"""
+        created = StockNotificationGenerator.generate(types=('out_of_stock', 'low_stock'))
         
-        low_stock_products = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lte=models.F('minimum_stock')
-        ).exclude(
-            notifications__type='low_stock',
-            notifications__created_at__date=timezone.now().date()
-        )
+        # Queue emails if configured
+        if getattr(settings, 'SEND_LOW_STOCK_EMAILS', False):
+            EmailQueue.enqueue(created)
         
-        notifications_created = 0
-        for product in low_stock_products:
-            notification = NotificationService.create_notification(
-                notification_type='low_stock',
-                title=f'Low Stock Alert: {product.name}',
-                message=f'Product {product.name} (SKU: {product.sku}) is running low on stock. Current quantity: {product.stock_quantity}, Minimum required: {product.minimum_stock}',
-                product=product,
-                priority='high' if product.stock_quantity == 0 else 'medium'
-            )
-            
-            # Send email if configured
-            if hasattr(settings, 'SEND_LOW_STOCK_EMAILS') and settings.SEND_LOW_STOCK_EMAILS:
-                NotificationService.send_email_notification(notification)
-            
-            notifications_created += 1
-        
-        return notifications_created
+        return len(created)
     
     @staticmethod
     def check_expiry_alerts():
-        """Check for expiring products and create notifications"""
-        from products.models import Product
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Products expiring within 7 days
-        expiry_date_threshold = timezone.now().date() + timedelta(days=7)
-        
-        expiring_products = Product.objects.filter(
-            is_active=True,
-            has_expiry=True,
-            expiry_date__lte=expiry_date_threshold,
-            expiry_date__gt=timezone.now().date()
-        ).exclude(
-            notifications__type='expiry_soon',
-            notifications__created_at__date=timezone.now().date()
-        )
-        
-        notifications_created = 0
-        for product in expiring_products:
-            days_until_expiry = (product.expiry_date - timezone.now().date()).days
-            
-            notification = NotificationService.create_notification(
-                notification_type='expiry_soon',
-                title=f'Product Expiring Soon: {product.name}',
-                message=f'Product {product.name} (SKU: {product.sku}) will expire in {days_until_expiry} days on {product.expiry_date}',
-                product=product,
-                priority='high' if days_until_expiry <= 3 else 'medium'
-            )
-            
-            notifications_created += 1
-        
-        # Already expired products
-        expired_products = Product.objects.filter(
-            is_active=True,
-            has_expiry=True,
-            expiry_date__lt=timezone.now().date()
-        ).exclude(
-            notifications__type='expired',
-            notifications__created_at__date=timezone.now().date()
-        )
-        
-        for product in expired_products:
-            notification = NotificationService.create_notification(
-                notification_type='expired',
-                title=f'Expired Product: {product.name}',
-                message=f'Product {product.name} (SKU: {product.sku}) has expired on {product.expiry_date}. Please remove from inventory.',
-                product=product,
-                priority='urgent'
-            )
-            
-            notifications_created += 1
-        
-        return notifications_created
+        """Check for expiring and expired products and create notifications"""
+        return len(StockNotificationGenerator.generate(types=('expiry_soon', 'expired')))
     
     @staticmethod
     def create_stock_movement_notification(stock_movement):
@@ -201,3 +72,635 @@ Inventory Plus System
             'low_stock_alerts': low_stock_count,
             'expiry_alerts': expiry_count
         }
+
+
+class StockNotificationGenerator:
+    """
+    Builds every stock notification type from a few SQL queries.
+
+    One products query per type selects the matching rows (category and
+    forecast joined in) and the new notifications are inserted with
+    bulk_create. Each generated notification carries a dedup bucket naming
+    the period it covers, unique per (type, bucket, product), so a product
+    is notified at most once per period even when runs overlap. Every entry
+    point (both NotificationService classes, the generate view, the check
+    commands and the post-commit alert evaluation) goes through generate().
+    """
+
+    TYPES = ('out_of_stock', 'low_stock', 'reorder_needed', 'expiry_soon', 'expired')
+    EXPIRY_WARNING_DAYS = 7
+    EXPIRY_URGENT_DAYS = 3
+
+    # 'daily' and 'hourly' allow one notification per local calendar day or
+    # hour, 'rolling' none within ROLLING_WINDOW of the last one; chosen per
+    # type with settings.NOTIFICATION_DEDUP_WINDOWS
+    DEDUP_WINDOWS = ('daily', 'hourly', 'rolling')
+    DEFAULT_DEDUP_WINDOW = 'daily'
+    ROLLING_WINDOW = timedelta(hours=24)
+
+    FIELDS = (
+        'id', 'name', 'sku', 'stock_quantity', 'minimum_stock', 'maximum_stock', 'reorder_level',
+        'unit_price', 'expiry_date', 'category__name',
+        'forecast__reorder_quantity', 'forecast__moving_average', 'forecast__smoothed_demand',
+        'forecast__stockout_date',
+    )
+
+    @staticmethod
+    def candidates(notification_type, today, product_ids=None):
+        """Active products that call for a notification of this type"""
+        from products.models import Product
+
+        products = Product.objects.filter(is_active=True)
+        if product_ids is not None:
+            products = products.filter(pk__in=list(product_ids))
+        if notification_type == 'out_of_stock':
+            return products.filter(stock_status='out')
+        if notification_type == 'low_stock':
+            return products.filter(stock_status='low')
+        if notification_type == 'reorder_needed':
+            # Low and out-of-stock products already get their own, more urgent notification
+            return products.filter(stock_status='reorder')
+        expiring = products.filter(has_expiry=True, expiry_date__isnull=False)
+        if notification_type == 'expiry_soon':
+            return expiring.filter(
+                expiry_date__gte=today,
+                expiry_date__lte=today + timedelta(days=StockNotificationGenerator.EXPIRY_WARNING_DAYS),
+            )
+        if notification_type == 'expired':
+            return expiring.filter(expiry_date__lt=today)
+        raise ValueError(f'Unknown stock notification type "{notification_type}"')
+
+    @staticmethod
+    def build(notification_type, row, today):
+        """Unsaved Notification for one candidate row (a dict of FIELDS)"""
+        name, sku = row['name'], row['sku']
+        extra_data = {
+            'current_stock': row['stock_quantity'],
+            'minimum_stock': row['minimum_stock'],
+            'category': row['category__name'],
+            'unit_price': str(row['unit_price']),
+        }
+        if notification_type == 'out_of_stock':
+            priority = 'urgent'
+            title = f'Out of Stock: {name}'
+            message = f'Product "{name}" (SKU: {sku}) is completely out of stock. Immediate restocking required.'
+        elif notification_type == 'low_stock':
+            priority = 'high'
+            title = f'Low Stock Alert: {name}'
+            message = (
+                f'Product "{name}" (SKU: {sku}) is running low. '
+                f'Current stock: {row["stock_quantity"]}, Minimum: {row["minimum_stock"]}'
+            )
+        elif notification_type == 'reorder_needed':
+            priority = 'medium'
+            title = f'Reorder Needed: {name}'
+            message = (
+                f'Product "{name}" (SKU: {sku}) has reached reorder level. '
+                f'Current stock: {row["stock_quantity"]}, Reorder level: {row["reorder_level"]}'
+            )
+            extra_data['reorder_level'] = row['reorder_level']
+        else:
+            days = (row['expiry_date'] - today).days
+            extra_data['expiry_date'] = row['expiry_date'].isoformat()
+            if notification_type == 'expired':
+                priority = 'urgent'
+                title = f'EXPIRED PRODUCT: {name}'
+                message = (
+                    f'Product "{name}" (SKU: {sku}) expired {-days} days ago on {row["expiry_date"]}. '
+                    f'Remove from inventory immediately!'
+                )
+                extra_data['days_expired'] = -days
+            else:
+                priority = 'urgent' if days <= StockNotificationGenerator.EXPIRY_URGENT_DAYS else 'high'
+                title = f'Product Expiring Soon: {name}'
+                message = f'Product "{name}" (SKU: {sku}) expires in {days} days on {row["expiry_date"]}.'
+                extra_data['days_until_expiry'] = days
+
+        if notification_type in ('out_of_stock', 'low_stock', 'reorder_needed'):
+            if row['forecast__reorder_quantity'] is not None:
+                extra_data['suggested_order_quantity'] = row['forecast__reorder_quantity']
+                extra_data['daily_demand'] = str(row['forecast__smoothed_demand'])
+                extra_data['average_daily_demand'] = str(row['forecast__moving_average'])
+                stockout_date = row['forecast__stockout_date']
+                extra_data['stockout_date'] = stockout_date.isoformat() if stockout_date else None
+            else:
+                maximum_stock = row['maximum_stock']
+                extra_data['suggested_order_quantity'] = (
+                    max(maximum_stock - row['stock_quantity'], 50) if maximum_stock else 50
+                )
+
+        return Notification(
+            type=notification_type,
+            title=title,
+            message=message,
+            product_id=row['id'],
+            priority=priority,
+            extra_data=extra_data,
+        )
+
+    @staticmethod
+    def dedup_window(notification_type):
+        """Configured dedup window of a notification type"""
+        from django.core.exceptions import ImproperlyConfigured
+
+        window = getattr(settings, 'NOTIFICATION_DEDUP_WINDOWS', {}).get(
+            notification_type, StockNotificationGenerator.DEFAULT_DEDUP_WINDOW
+        )
+        if window not in StockNotificationGenerator.DEDUP_WINDOWS:
+            raise ImproperlyConfigured(
+                f'NOTIFICATION_DEDUP_WINDOWS["{notification_type}"] must be one of '
+                f'{", ".join(StockNotificationGenerator.DEDUP_WINDOWS)}, not "{window}"'
+            )
+        return window
+
+    @staticmethod
+    def dedup_bucket(window, now):
+        """Dedup key of the period containing ``now``"""
+        if window == 'daily':
+            return f'day:{timezone.localdate(now).isoformat()}'
+        if window == 'hourly':
+            return f'hour:{timezone.localtime(now):%Y-%m-%dT%H}'
+        # Rolling windows are enforced by already_notified(); two notifications in one
+        # 24-hour epoch bucket would always be too close, so the key only has
+        # to stop overlapping runs inserting the same one twice
+        return f'rolling:{int(now.timestamp()) // 86400}'
+
+    @staticmethod
+    def already_notified(notification_type, window, bucket, now):
+        """Filter matching products that already have this notification in the current window"""
+        from django.db.models import Exists, OuterRef
+
+        existing = Notification.objects.filter(product=OuterRef('pk'), type=notification_type)
+        if window == 'rolling':
+            existing = existing.filter(created_at__gte=now - StockNotificationGenerator.ROLLING_WINDOW)
+        else:
+            # A point lookup on the unique (type, dedup_bucket, product) index
+            existing = existing.filter(dedup_bucket=bucket)
+        return Exists(existing)
+
+    @staticmethod
+    def _insert(batch):
+        """bulk_create ignoring dedup key conflicts; return the rows actually inserted"""
+        Notification.objects.bulk_create(batch, ignore_conflicts=True)
+        inserted = set(
+            Notification.objects.filter(pk__in=[notification.pk for notification in batch]).values_list('pk', flat=True)
+        )
+        return [notification for notification in batch if notification.pk in inserted]
+
+    @staticmethod
+    def generate(types=None, product_ids=None, now=None, dry_run=False, batch_size=1000):
+        """
+        Create the due notifications of the given types (default: all).
+
+        Products already notified in the type's dedup window are skipped by
+        an index lookup, and rows a concurrent run inserted first are
+        dropped by the unique dedup key. ``product_ids`` limits the run to
+        those products. Returns the new Notification objects; with
+        ``dry_run`` they are built but not saved.
+        """
+        now = now or timezone.now()
+        today = timezone.localdate(now)
+        if product_ids is not None:
+            product_ids = list(product_ids)
+
+        created = []
+        with transaction.atomic():
+            for notification_type in types or StockNotificationGenerator.TYPES:
+                window = StockNotificationGenerator.dedup_window(notification_type)
+                bucket = StockNotificationGenerator.dedup_bucket(window, now)
+                rows = StockNotificationGenerator.candidates(notification_type, today, product_ids).exclude(
+                    StockNotificationGenerator.already_notified(notification_type, window, bucket, now)
+                ).order_by().values(*StockNotificationGenerator.FIELDS)
+
+                batch = []
+                for row in rows.iterator(chunk_size=batch_size):
+                    notification = StockNotificationGenerator.build(notification_type, row, today)
+                    notification.dedup_bucket = bucket
+                    batch.append(notification)
+                    if len(batch) >= batch_size:
+                        created.extend(batch if dry_run else StockNotificationGenerator._insert(batch))
+                        batch = []
+                if batch:
+                    created.extend(batch if dry_run else StockNotificationGenerator._insert(batch))
+        return created
+
+    @staticmethod
+    def count_by_type(notifications):
+        counts = dict.fromkeys(StockNotificationGenerator.TYPES, 0)
+        for notification in notifications:
+            counts[notification.type] = counts.get(notification.type, 0) + 1
+        return counts
+
+
+class EmailQueue:
+    """
+    Notification emails queued in EmailOutbox and sent by a worker process.
+
+    Callers only render and insert rows, so a request or an alert run never
+    waits on SMTP; below the immediate priorities, notifications are held
+    and sent as one digest per recipient. The process_email_queue worker
+    builds due digests, claims due rows urgent first, sends each batch over
+    one SMTP connection and records the outcome per message; failures are
+    retried with exponential backoff until MAX_ATTEMPTS, then marked failed.
+    """
+
+    BATCH_SIZE = 100
+    MAX_ATTEMPTS = 6
+    RETRY_DELAY = timedelta(minutes=1)
+    MAX_RETRY_DELAY = timedelta(hours=6)
+
+    # Rows claimed by a worker that died mid-batch go back to pending after
+    # this. The worker renews the claim on each message right before sending
+    # it, so the timeout bounds one message, not a whole batch
+    CLAIM_TIMEOUT = timedelta(minutes=10)
+
+    # Notifications per IN (...) lookup; keeps statements under SQLite's parameter limit
+    LOOKUP_BATCH = 900
+
+    @staticmethod
+    def default_recipients():
+        """Emails of every active admin and manager"""
+        from . import recipients
+        return recipients.default_recipients()
+
+    @staticmethod
+    def render(notification):
+        """Subject, plain text and HTML body of a notification email"""
+        html_message = render_to_string('emails/notification_email.html', {
+            'notification': notification,
+            'site_name': 'Inventory Plus',
+            'site_url': getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'),
+        })
+        plain_message = f"""
+{notification.title}
+
+{notification.message}
+
+Priority: {notification.get_priority_display()}
+Type: {notification.get_type_display()}
+Created: {notification.created_at}
+
+---
+Inventory Plus System
+"""
+        return f"[Inventory Plus] {notification.title}", plain_message, html_message
+
+    @staticmethod
+    def is_digested(notification):
+        """Whether the notification waits for the next digest instead of going out on its own"""
+        return (
+            getattr(settings, 'EMAIL_DIGEST_MINUTES', 0) > 0
+            and notification.priority not in getattr(settings, 'EMAIL_IMMEDIATE_PRIORITIES', ['urgent'])
+        )
+
+    @staticmethod
+    def enqueue(notifications, recipients=None, immediate=False):
+        """
+        Queue the emails for some notifications and return how many were queued.
+
+        Each notification gets its own email when it has an immediate
+        priority, digests are off or ``immediate`` is set; otherwise it waits
+        for each recipient's next digest. Notifications with an email or
+        digest already waiting are skipped. Without ``recipients``, a user's
+        own notification goes to that user, a stock alert's to the alert's
+        recipients (none when its email_notifications is off) and the rest
+        to every active admin and manager, all resolved from the cached
+        recipient directory.
+        """
+        from django.db.models import Q
+        from . import recipients as directory_cache
+        from .models import DigestEntry, EmailOutbox
+
+        ids = [notification.pk for notification in notifications]
+        directory = None if recipients else directory_cache.get_directory()
+        queued = 0
+        for offset in range(0, len(ids), EmailQueue.LOOKUP_BATCH):
+            chunk = ids[offset:offset + EmailQueue.LOOKUP_BATCH]
+            waiting = set(EmailOutbox.objects.filter(
+                notification_id__in=chunk, status__in=('pending', 'sending')
+            ).values_list('notification_id', flat=True))
+            waiting.update(DigestEntry.objects.filter(notification_id__in=chunk).filter(
+                Q(email__isnull=True) | Q(email__status__in=('pending', 'sending'))
+            ).values_list('notification_id', flat=True))
+
+            emails = []
+            entries = []
+            pending = [
+                notification
+                for notification in Notification.objects.filter(pk__in=chunk).select_related('product__category')
+                if notification.pk not in waiting
+            ]
+            alerts = {}
+            if not recipients:
+                alerts = directory_cache.alert_recipients(
+                    [
+                        notification.extra_data['stock_alert_id'] for notification in pending
+                        if isinstance(notification.extra_data, dict) and notification.extra_data.get('stock_alert_id')
+                    ],
+                    directory,
+                )
+            for notification in pending:
+                to = recipients
+                alert_id = isinstance(notification.extra_data, dict) and notification.extra_data.get('stock_alert_id')
+                if not to and notification.user_id:
+                    to = directory_cache.user_emails([notification.user_id], directory)
+                elif not to and alert_id in alerts:
+                    to = alerts[alert_id]
+                    if to is None:
+                        # The alert has email notifications turned off
+                        continue
+                elif not to:
+                    to = directory_cache.default_recipients(directory)
+                if not to:
+                    logger.warning(f"No recipients found for notification {notification.id}")
+                    continue
+
+                queued += 1
+                if not immediate and EmailQueue.is_digested(notification):
+                    # Rendered later, once per recipient, into the digest
+                    entries.extend(DigestEntry(notification=notification, recipient=email) for email in to)
+                    continue
+
+                subject, body, html_body = EmailQueue.render(notification)
+                emails.append(EmailOutbox(
+                    notification=notification,
+                    subject=subject[:255],
+                    body=body,
+                    html_body=html_body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipients=list(to),
+                    priority=notification.priority,
+                    priority_rank=EmailOutbox.PRIORITY_RANKS.get(notification.priority, 2),
+                ))
+            EmailOutbox.objects.bulk_create(emails)
+            DigestEntry.objects.bulk_create(entries, batch_size=500)
+
+        return queued
+
+    # Digest sections in display order; each notification goes in the first that matches
+    DIGEST_SECTIONS = (
+        ('urgent', 'Urgent'),
+        ('out_of_stock', 'Out of stock'),
+        ('expiry', 'Expiring and expired'),
+        ('stock', 'Low stock and reorders'),
+        ('other', 'Other notifications'),
+    )
+
+    # Items listed per digest section; the rest are counted
+    DIGEST_SECTION_LIMIT = 50
+
+    @staticmethod
+    def digest_section(notification):
+        if notification.priority == 'urgent':
+            return 'urgent'
+        if notification.type == 'out_of_stock':
+            return 'out_of_stock'
+        if notification.type in ('expiry_soon', 'expired'):
+            return 'expiry'
+        if notification.type in ('low_stock', 'reorder_needed'):
+            return 'stock'
+        return 'other'
+
+    @staticmethod
+    def render_digest(notifications, since):
+        """Subject, plain text and HTML body of one digest email"""
+        from .models import EmailOutbox
+
+        grouped = {key: [] for key, _ in EmailQueue.DIGEST_SECTIONS}
+        for notification in sorted(
+            notifications, key=lambda n: (EmailOutbox.PRIORITY_RANKS.get(n.priority, 2), n.created_at)
+        ):
+            grouped[EmailQueue.digest_section(notification)].append(notification)
+
+        limit = EmailQueue.DIGEST_SECTION_LIMIT
+        sections = [
+            {
+                'key': key,
+                'title': title,
+                'count': len(grouped[key]),
+                'notifications': grouped[key][:limit],
+                'more': max(len(grouped[key]) - limit, 0),
+            }
+            for key, title in EmailQueue.DIGEST_SECTIONS
+            if grouped[key]
+        ]
+        total = len(notifications)
+
+        html_message = render_to_string('emails/notification_digest.html', {
+            'sections': sections,
+            'total': total,
+            'since': since,
+            'site_name': 'Inventory Plus',
+            'site_url': getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'),
+        })
+        lines = [f"{total} inventory alerts since {timezone.localtime(since):%Y-%m-%d %H:%M}", '']
+        for section in sections:
+            lines.append(f"{section['title']} ({section['count']})")
+            lines.extend(f"  - {notification.title}" for notification in section['notifications'])
+            if section['more']:
+                lines.append(f"  ... and {section['more']} more")
+            lines.append('')
+        lines.extend(['---', 'Inventory Plus System'])
+
+        urgent = len(grouped['urgent'])
+        subject = f"[Inventory Plus] Inventory digest: {total} alerts"
+        if urgent:
+            subject += f" ({urgent} urgent)"
+        return subject, '\n'.join(lines), html_message
+
+    @staticmethod
+    def build_digests(now=None, flush=False):
+        """
+        Turn waiting digest entries into one queued email per recipient.
+
+        A recipient's digest is built once their oldest waiting entry is
+        EMAIL_DIGEST_MINUTES old, or straight away with ``flush``. Returns
+        the number of digest emails queued.
+        """
+        from django.db.models import Min
+        from .models import DigestEntry, EmailOutbox
+
+        now = now or timezone.now()
+        waiting = DigestEntry.objects.filter(email__isnull=True)
+        due = waiting.values('recipient').annotate(since=Min('created_at')).order_by()
+        if not flush:
+            due = due.filter(since__lte=now - timedelta(minutes=getattr(settings, 'EMAIL_DIGEST_MINUTES', 0)))
+
+        built = 0
+        for recipient, since in list(due.values_list('recipient', 'since')):
+            with transaction.atomic():
+                entries = list(waiting.filter(recipient=recipient).select_related('notification__product'))
+                if not entries:
+                    continue
+                notifications = [entry.notification for entry in entries]
+                subject, body, html_body = EmailQueue.render_digest(notifications, since)
+                priority = min(
+                    (notification.priority for notification in notifications),
+                    key=lambda priority: EmailOutbox.PRIORITY_RANKS.get(priority, 2),
+                )
+                digest = EmailOutbox.objects.create(
+                    subject=subject[:255],
+                    body=body,
+                    html_body=html_body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipients=[recipient],
+                    priority=priority,
+                )
+                # Entries added while this digest was rendered stay for the next one
+                for offset in range(0, len(entries), EmailQueue.LOOKUP_BATCH):
+                    DigestEntry.objects.filter(
+                        pk__in=[entry.pk for entry in entries[offset:offset + EmailQueue.LOOKUP_BATCH]]
+                    ).update(email=digest)
+                built += 1
+        return built
+
+    @staticmethod
+    def claim(batch_size, now):
+        """Mark up to ``batch_size`` due emails as sending, urgent first, and return them"""
+        import uuid
+        from .models import EmailOutbox
+
+        # Rows left in 'sending' by a worker that died are due again
+        EmailOutbox.objects.filter(
+            status='sending', claimed_at__lt=now - EmailQueue.CLAIM_TIMEOUT
+        ).update(status='pending', claimed_at=None, claim_token=None)
+
+        due = EmailOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+        ids = list(due.order_by('priority_rank', 'next_attempt_at').values_list('id', flat=True)[:batch_size])
+        # Only rows still pending are taken, so two workers never claim the same email
+        token = uuid.uuid4()
+        due.filter(pk__in=ids).update(status='sending', claimed_at=now, claim_token=token)
+        return list(
+            EmailOutbox.objects.filter(claim_token=token, status='sending').order_by('priority_rank', 'next_attempt_at')
+        )
+
+    @staticmethod
+    def renew_claim(email):
+        """Extend the claim on one email; False if it timed out and another worker may hold it"""
+        from .models import EmailOutbox
+
+        return EmailOutbox.objects.filter(
+            pk=email.pk, status='sending', claim_token=email.claim_token
+        ).update(claimed_at=timezone.now()) == 1
+
+    @staticmethod
+    def send(emails, connection):
+        """
+        Send claimed emails over one connection; return (sent, failed).
+
+        Each message is handed to send_messages() on its own so a refused
+        message fails alone. The claim is renewed right before each message;
+        a message whose claim was lost is left to the worker that took it
+        and counts as neither sent nor failed. After a failure the connection
+        is reopened, and if that fails the rest of the batch is failed with
+        the error.
+        """
+        from django.core.mail import EmailMultiAlternatives
+        from .recipients import retired_emails
+
+        # Users deactivated since the email was queued no longer get it
+        retired = retired_emails()
+        sent, failed = [], []
+        index = 0
+        try:
+            connection.open()
+            while index < len(emails):
+                email = emails[index]
+                index += 1
+                to = [address for address in email.recipients if address.lower() not in retired]
+                if not to:
+                    email.last_error = 'No active recipients left'
+                    # record() gives up on it instead of retrying
+                    email.attempts = max(email.attempts, EmailQueue.MAX_ATTEMPTS - 1)
+                    failed.append(email)
+                    continue
+                if not EmailQueue.renew_claim(email):
+                    logger.warning(f"Claim on email {email.pk} expired before it was sent; skipping it")
+                    continue
+                message = EmailMultiAlternatives(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email,
+                    to=to,
+                    connection=connection,
+                )
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+                try:
+                    if not connection.send_messages([message]):
+                        raise ValueError('Message was not accepted for delivery')
+                except Exception as e:
+                    email.last_error = str(e)
+                    failed.append(email)
+                    connection.close()
+                    connection.open()
+                else:
+                    sent.append(email)
+        except Exception as e:
+            for email in emails[index:]:
+                email.last_error = f'Connection failed: {e}'
+                failed.append(email)
+        finally:
+            connection.close()
+        return sent, failed
+
+    @staticmethod
+    def record(sent, failed, now):
+        """Store the outcome of a batch and schedule retries"""
+        from django.db.models import F
+        from .models import EmailOutbox
+
+        with transaction.atomic():
+            if sent:
+                EmailOutbox.objects.filter(pk__in=[email.pk for email in sent]).update(
+                    status='sent', sent_at=now, claimed_at=None, claim_token=None, last_error='',
+                    attempts=F('attempts') + 1,
+                )
+                Notification.objects.filter(
+                    pk__in=[email.notification_id for email in sent if email.notification_id]
+                ).update(is_email_sent=True, email_sent_at=now)
+                # Notifications that went out in a digest
+                Notification.objects.filter(
+                    digest_entries__email__in=[email.pk for email in sent if not email.notification_id],
+                    is_email_sent=False,
+                ).update(is_email_sent=True, email_sent_at=now)
+
+            for email in failed:
+                email.attempts += 1
+                email.claimed_at = None
+                email.claim_token = None
+                if email.attempts >= EmailQueue.MAX_ATTEMPTS:
+                    email.status = 'failed'
+                    logger.error(f"Giving up on email {email.pk} after {email.attempts} attempts: {email.last_error}")
+                else:
+                    email.status = 'pending'
+                    email.next_attempt_at = now + min(
+                        EmailQueue.RETRY_DELAY * 2 ** (email.attempts - 1), EmailQueue.MAX_RETRY_DELAY
+                    )
+            EmailOutbox.objects.bulk_update(
+                failed, ['status', 'attempts', 'next_attempt_at', 'claimed_at', 'claim_token', 'last_error']
+            )
+
+    @staticmethod
+    def process(batch_size=None, max_batches=None, connection=None):
+        """
+        Send due emails batch by batch until none are left; return (sent, failed).
+
+        Digests that are due are built first. One connection object is
+        reused for every batch and opened once per batch.
+        """
+        from django.core.mail import get_connection
+
+        EmailQueue.build_digests()
+        connection = connection or get_connection(fail_silently=False)
+        total_sent = total_failed = batches = 0
+        while max_batches is None or batches < max_batches:
+            emails = EmailQueue.claim(batch_size or EmailQueue.BATCH_SIZE, timezone.now())
+            if not emails:
+                break
+            sent, failed = EmailQueue.send(emails, connection)
+            EmailQueue.record(sent, failed, timezone.now())
+            total_sent += len(sent)
+            total_failed += len(failed)
+            batches += 1
+        return total_sent, total_failed
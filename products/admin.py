@@ -20,9 +20,13 @@ class CategoryAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return Category.with_products_count(super().get_queryset(request))
+    
     def get_products_count(self, obj):
         return obj.get_products_count()
     get_products_count.short_description = 'Products Count'
+    get_products_count.admin_order_field = 'products_count'
 
 
 @admin.register(Product)
@@ -0,0 +1,182 @@
+"""
+Faceted filter counts for the product list, one SQL statement per facet group
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils.http import urlencode
+from .search import search_products
+import hashlib
+import json
+import uuid
+
+
+FACET_CACHE_TIMEOUT = 60
+FACET_CACHE_PREFIX = 'product-facets'
+
+# Most common values shown for the open-ended facets (brand, supplier)
+FACET_LIMIT = 15
+
+FILTER_PARAMS = ('query', 'category', 'stock_status', 'brand', 'supplier')
+
+# stock_status filter value -> stored Product.stock_status values
+STOCK_STATUS_FILTERS = {
+    'high': ('ok', 'reorder'),
+    'ok': ('ok',),
+    'reorder': ('reorder',),
+    'low': ('low',),
+    'out': ('out',),
+}
+
+
+def _uuid_or_none(value):
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+def normalize_filters(params):
+    """
+    Canonical filter dict from request parameters.
+
+    Empty and invalid values are dropped and the search query is collapsed
+    to lower-case single-spaced text, so equivalent requests share one
+    cache entry.
+    """
+    filters = {}
+    for key in FILTER_PARAMS:
+        value = ' '.join((params.get(key) or '').split())
+        if key == 'query':
+            value = value.lower()
+        elif key in ('category', 'supplier'):
+            value = _uuid_or_none(value) if value else None
+        elif key == 'stock_status' and value not in STOCK_STATUS_FILTERS:
+            value = None
+        if value:
+            filters[key] = value
+    return filters
+
+
+def filter_querystring(filters, **changes):
+    """Query string for the filters with some values replaced (None removes one)"""
+    params = dict(filters)
+    for key, value in changes.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return urlencode([(key, params[key]) for key in FILTER_PARAMS if key in params])
+
+
+def apply_filters(queryset, filters, exclude=None):
+    """Apply normalized filters to a Product queryset, leaving out the ``exclude`` facet"""
+    from suppliers.models import SupplierProduct
+
+    if filters.get('query'):
+        queryset = search_products(queryset, filters['query'])
+    if 'category' in filters and exclude != 'category':
+        queryset = queryset.filter(category_id=filters['category'])
+    if 'stock_status' in filters and exclude != 'stock_status':
+        queryset = queryset.filter(stock_status__in=STOCK_STATUS_FILTERS[filters['stock_status']])
+    if 'brand' in filters and exclude != 'brand':
+        queryset = queryset.filter(brand=filters['brand'])
+    if 'supplier' in filters and exclude != 'supplier':
+        queryset = queryset.filter(
+            id__in=SupplierProduct.objects.filter(supplier_id=filters['supplier']).values('product_id')
+        )
+    return queryset
+
+
+def compute_facet_counts(filters):
+    """
+    Count products per facet value, uncached.
+
+    Each facet group is counted against the products matching every
+    *other* active filter, so the numbers say how many results picking
+    that value would give. Stock status uses conditional aggregation over
+    its fixed set of values; the open-ended groups are a single GROUP BY.
+    """
+    from .models import Product
+
+    base = Product.objects.filter(is_active=True)
+
+    def scoped(facet):
+        return apply_filters(base, filters, exclude=facet).order_by()
+
+    statuses = [status for status, _ in Product.STOCK_STATUS_CHOICES]
+    status_counts = scoped('stock_status').aggregate(
+        **{status: Count('id', filter=Q(stock_status=status)) for status in statuses}
+    )
+    status_counts['high'] = status_counts['ok'] + status_counts['reorder']
+    selected = STOCK_STATUS_FILTERS.get(filters.get('stock_status'), statuses)
+    total = sum(status_counts[status] for status in selected)
+
+    categories = scoped('category').values('category_id', 'category__name').annotate(
+        count=Count('id')
+    ).order_by('category__name')
+
+    brands = scoped('brand').exclude(brand__isnull=True).exclude(brand='').values('brand').annotate(
+        count=Count('id')
+    ).order_by('-count', 'brand')[:FACET_LIMIT]
+
+    # Grouped from the product side: the search clause must stay on the outer query
+    suppliers = scoped('supplier').filter(supplierproduct__supplier__is_active=True).values(
+        supplier_id=F('supplierproduct__supplier_id'),
+        supplier_name=F('supplierproduct__supplier__name'),
+    ).annotate(count=Count('id', distinct=True)).order_by('-count', 'supplier_name')[:FACET_LIMIT]
+
+    return {
+        'total': total,
+        'category': [
+            {'value': str(row['category_id']), 'label': row['category__name'], 'count': row['count']}
+            for row in categories
+        ],
+        'stock_status': [
+            {'value': status, 'count': status_counts[status]}
+            for status in ('high', *statuses)
+        ],
+        'brand': [
+            {'value': row['brand'], 'label': row['brand'], 'count': row['count']}
+            for row in brands
+        ],
+        'supplier': [
+            {'value': str(row['supplier_id']), 'label': row['supplier_name'], 'count': row['count']}
+            for row in suppliers
+        ],
+    }
+
+
+def facet_cache_key(filters):
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return f'{FACET_CACHE_PREFIX}:{digest}'
+
+
+def facet_counts(filters):
+    """Facet counts for normalized filters, cached for FACET_CACHE_TIMEOUT seconds"""
+    key = facet_cache_key(filters)
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute_facet_counts(filters)
+        cache.set(key, counts, FACET_CACHE_TIMEOUT)
+    return counts
+
+
+def facet_links(counts, filters):
+    """
+    Attach ``url`` and ``selected`` to every facet value for rendering.
+
+    Selecting a value replaces that facet's filter; clicking the selected
+    value again clears it. Pagination state is never carried over.
+    """
+    groups = {}
+    for facet in ('category', 'stock_status', 'brand', 'supplier'):
+        values = []
+        for item in counts[facet]:
+            selected = filters.get(facet) == item['value']
+            values.append({
+                **item,
+                'selected': selected,
+                'url': '?' + filter_querystring(filters, **{facet: None if selected else item['value']}),
+            })
+        groups[facet] = values
+    return groups
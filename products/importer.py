@@ -0,0 +1,288 @@
+"""
+Streaming bulk import of product catalogs from CSV or XLSX files
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import time
+import uuid
+
+
+IMPORT_FIELDS = (
+    'sku', 'name', 'category', 'unit_price', 'barcode', 'description', 'cost_price',
+    'selling_price', 'unit', 'minimum_stock', 'maximum_stock', 'reorder_level', 'brand',
+    'model_number', 'color', 'size', 'material',
+)
+REQUIRED_FIELDS = ('sku', 'name', 'category', 'unit_price')
+DECIMAL_FIELDS = ('unit_price', 'cost_price', 'selling_price')
+INTEGER_FIELDS = ('minimum_stock', 'maximum_stock', 'reorder_level')
+
+# Rejected rows kept in memory for display; the error file gets all of them
+MAX_REPORTED_ERRORS = 200
+
+# Always written on conflict; id, created_at, created_by and stock_quantity stay untouched.
+# Other columns are only written when the row has a value for them.
+UPDATE_FIELDS = ['category', 'last_updated_by', 'updated_at']
+
+
+class ImportFormatError(Exception):
+    """Raised when the uploaded file cannot be read as a catalog"""
+
+
+def error_file_storage():
+    """Storage for rejected-row files; outside MEDIA_ROOT, served only by product_import_errors"""
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage
+
+    return FileSystemStorage(location=settings.IMPORT_ERRORS_ROOT, base_url=None)
+
+
+def iter_csv_rows(stream):
+    """Yield dict rows from a binary or text CSV stream without reading it all"""
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(stream, 'mode', ''):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if not header:
+        raise ImportFormatError('The file is empty')
+    columns = [column.strip().lower() for column in header]
+    for values in reader:
+        if any(value.strip() for value in values):
+            yield dict(zip(columns, values))
+
+
+def iter_xlsx_rows(stream):
+    """Yield dict rows from the first sheet of an XLSX workbook in read-only mode"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('XLSX import requires openpyxl to be installed')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError('The worksheet is empty')
+        columns = [str(column or '').strip().lower() for column in header]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield {
+                    column: '' if value is None else str(value)
+                    for column, value in zip(columns, values)
+                }
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream, filename):
+    """Pick the row reader from the file extension"""
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx_rows(stream)
+    if filename.lower().endswith('.csv'):
+        return iter_csv_rows(stream)
+    raise ImportFormatError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+
+class ProductImporter:
+    """
+    Validate and upsert catalog rows in fixed-size chunks.
+
+    Existing SKUs and barcodes are preloaded once, so uniqueness is checked
+    in memory. Each chunk becomes one INSERT ... ON CONFLICT (sku) DO UPDATE
+    per set of filled-in columns, so a blank cell never overwrites an
+    existing product's value. Only the current chunk is held in memory.
+    Stock quantities are never imported; stock only changes through the
+    stock ledger.
+    """
+
+    def __init__(self, user=None, batch_size=1000, create_categories=True, error_stream=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.create_categories = create_categories
+        self.errors = []
+        self.error_writer = None
+        if error_stream is not None:
+            self.error_writer = csv.writer(error_stream)
+            self.error_writer.writerow(['line', 'sku', 'error'])
+        self.stats = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0, 'seconds': 0, 'rows_per_second': 0}
+
+    def preload(self):
+        from .models import Category, Product
+
+        self.existing_skus = set()
+        self.barcode_owners = {}
+        for sku, barcode in Product.objects.values_list('sku', 'barcode').iterator(chunk_size=10000):
+            self.existing_skus.add(sku)
+            if barcode:
+                self.barcode_owners[barcode] = sku
+        self.categories = {
+            name.lower(): pk for pk, name in Category.objects.values_list('id', 'name')
+        }
+        self.seen_skus = set()
+
+    def run(self, rows):
+        """Import an iterable of dict rows and return the stats"""
+        start_time = time.perf_counter()
+        self.preload()
+
+        chunk = []
+        for line, row in enumerate(rows, start=2):
+            self.stats['rows'] += 1
+            product = self.build_product(line, row)
+            if product is not None:
+                chunk.append((line, row, product))
+            if len(chunk) >= self.batch_size:
+                self.flush(chunk)
+                chunk = []
+        if chunk:
+            self.flush(chunk)
+
+        self.stats['seconds'] = round(time.perf_counter() - start_time, 3)
+        self.stats['rows_per_second'] = round(self.stats['rows'] / max(self.stats['seconds'], 1e-9))
+        return self.stats
+
+    def fail(self, line, row, message):
+        error = {'line': line, 'sku': (row.get('sku') or '').strip(), 'error': message}
+        self.stats['failed'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+        if self.error_writer is not None:
+            self.error_writer.writerow([error['line'], error['sku'], error['error']])
+        return None
+
+    def build_product(self, line, row):
+        """Turn a row into an unsaved Product, or record why it was rejected"""
+        from .models import Product
+
+        values = {field: (row.get(field) or '').strip() for field in IMPORT_FIELDS}
+        missing = [field for field in REQUIRED_FIELDS if not values[field]]
+        if missing:
+            return self.fail(line, row, f'Missing required column(s): {", ".join(missing)}')
+
+        # Same normalisation as Product.save()
+        sku = values['sku'].upper()
+        if sku in self.seen_skus:
+            return self.fail(line, row, f'Duplicate SKU {sku} earlier in the file')
+
+        barcode = values['barcode'] or None
+        if barcode and self.barcode_owners.get(barcode, sku) != sku:
+            return self.fail(line, row, f'Barcode {barcode} already belongs to {self.barcode_owners[barcode]}')
+
+        category_id = self.resolve_category(values['category'])
+        if category_id is None:
+            return self.fail(line, row, f'Unknown category "{values["category"]}"')
+
+        fields = {}
+        for field in DECIMAL_FIELDS + INTEGER_FIELDS:
+            if not values[field]:
+                continue
+            try:
+                number = Decimal(values[field])
+            except InvalidOperation:
+                return self.fail(line, row, f'Invalid number in column {field}')
+            # Decimal accepts inf and nan, which no column can store
+            if not number.is_finite():
+                return self.fail(line, row, f'Invalid number in column {field}')
+            if field in INTEGER_FIELDS:
+                if number != number.to_integral_value():
+                    return self.fail(line, row, f'Column {field} must be a whole number')
+                number = int(number)
+            fields[field] = number
+
+        product = Product(
+            id=uuid.uuid4(),
+            sku=sku,
+            barcode=barcode,
+            category_id=category_id,
+            created_by=self.user,
+            last_updated_by=self.user,
+            **{
+                field: values[field] or None
+                for field in ('name', 'description', 'brand', 'model_number', 'color', 'size', 'material')
+            },
+            **fields,
+        )
+        if values['unit']:
+            product.unit = values['unit'].lower()
+
+        try:
+            product.clean_fields(exclude=['id', 'category', 'created_by', 'last_updated_by', 'image', 'stock_status'])
+        except ValidationError as e:
+            return self.fail(line, row, '; '.join(
+                f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items()
+            ))
+
+        self.seen_skus.add(sku)
+        if barcode:
+            self.barcode_owners[barcode] = sku
+        return product
+
+    def resolve_category(self, name):
+        from .models import Category
+
+        key = name.lower()
+        if key not in self.categories and self.create_categories:
+            category, _ = Category.objects.get_or_create(name=name, defaults={'created_by': self.user})
+            self.categories[key] = category.pk
+        return self.categories.get(key)
+
+    @staticmethod
+    def filled_fields(row):
+        """Columns an existing product takes from this row: the non-blank cells plus UPDATE_FIELDS"""
+        return tuple(
+            field for field in IMPORT_FIELDS
+            if field not in ('sku', 'category') and (row.get(field) or '').strip()
+        ) + tuple(UPDATE_FIELDS)
+
+    def flush(self, chunk):
+        """
+        Upsert one chunk of (line, row, product) and refresh the search and
+        scan indexes for it. Rows are grouped by their filled-in columns,
+        one statement per group. When a group violates a constraint the
+        preload could not see (a concurrent write, say), its rows are
+        retried one by one and the offending ones are rejected.
+        """
+        groups = {}
+        for entry in chunk:
+            groups.setdefault(self.filled_fields(entry[1]), []).append(entry)
+
+        for update_fields, entries in groups.items():
+            try:
+                self.upsert([product for _, _, product in entries], update_fields)
+            except IntegrityError:
+                for line, row, product in entries:
+                    try:
+                        self.upsert([product], update_fields)
+                    except IntegrityError as e:
+                        self.seen_skus.discard(product.sku)
+                        if product.barcode and self.barcode_owners.get(product.barcode) == product.sku:
+                            del self.barcode_owners[product.barcode]
+                        self.fail(line, row, f'Conflicts with an existing product: {e}')
+
+    def upsert(self, products, update_fields):
+        from inventory.services import AlertEvaluationService
+        from .models import Product
+        from .search import SEARCH_FIELDS, index_products
+        from .scan_index import ProductScanIndex
+
+        skus = [product.sku for product in products]
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=list(update_fields),
+            )
+            # bulk_create skips post_save, and conflicting rows keep their original id
+            saved = list(Product.objects.filter(sku__in=skus).only('id', *SEARCH_FIELDS))
+            index_products(saved)
+            ProductScanIndex.invalidate_on_commit([product.pk for product in saved])
+            AlertEvaluationService.schedule(product.pk for product in saved)
+
+        updated = sum(1 for sku in skus if sku in self.existing_skus)
+        self.stats['updated'] += updated
+        self.stats['created'] += len(skus) - updated
+        self.existing_skus.update(skus)
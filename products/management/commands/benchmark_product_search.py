@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from products.models import Category, Product
+from products.search import (
+    is_index_available, index_products, remove_products, search_products, substring_filter
+)
+import random
+import statistics
+import time
+import uuid
+
+
+WORDS = [
+    'steel', 'cable', 'office', 'chair', 'desk', 'laptop', 'stand', 'paper', 'ream', 'marker',
+    'battery', 'charger', 'monitor', 'keyboard', 'mouse', 'printer', 'toner', 'folder', 'lamp', 'bottle',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the FTS5 product search index against the icontains scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create this many temporary products before benchmarking',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of search queries to run per path (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        if not is_index_available():
+            raise CommandError('Search index not found. Run migrate or rebuild_search_index first.')
+
+        seeded_ids = self.seed_products(options['seed']) if options['seed'] else []
+
+        try:
+            names = list(
+                Product.objects.filter(is_active=True).values_list('name', 'sku')[:5000]
+            )
+            if not names:
+                raise CommandError('No active products to search. Use --seed.')
+
+            catalog_size = Product.objects.filter(is_active=True).count()
+            queries = []
+            for _ in range(options['queries']):
+                name, sku = random.choice(names)
+                source = random.choice([name, sku])
+                start = random.randint(0, max(0, len(source) - 4))
+                queries.append(source[start:start + random.randint(3, 6)])
+
+            base = Product.objects.filter(is_active=True)
+            icontains_times = self.time_queries(
+                queries, lambda q: list(base.filter(substring_filter(q))[:10])
+            )
+            fts_times = self.time_queries(
+                queries, lambda q: list(search_products(base, q)[:10])
+            )
+
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 PRODUCT SEARCH BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Active products: {catalog_size}')
+            self.stdout.write(f'Queries per path: {len(queries)}')
+            self.report('icontains scan', icontains_times)
+            self.report('FTS5 trigram', fts_times)
+            speedup = statistics.mean(icontains_times) / max(statistics.mean(fts_times), 1e-9)
+            self.stdout.write(self.style.SUCCESS(f'\n⚡ Speedup: {speedup:.1f}x'))
+        finally:
+            if seeded_ids:
+                Product.objects.filter(pk__in=seeded_ids).delete()
+                remove_products(seeded_ids)
+
+    def seed_products(self, count):
+        self.stdout.write(f'🌱 Seeding {count} temporary products...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        seeded_ids = []
+        batch_size = 5000
+        with transaction.atomic():
+            for offset in range(0, count, batch_size):
+                batch = [
+                    Product(
+                        id=uuid.uuid4(),
+                        name=' '.join(random.sample(WORDS, 3)).title() + f' {offset + i}',
+                        sku=f'BS-{uuid.uuid4().hex[:10].upper()}',
+                        barcode=f'{random.randint(10**12, 10**13 - 1)}{offset + i}',
+                        brand=random.choice(WORDS).title(),
+                        category=category,
+                        unit_price=1,
+                    )
+                    for i in range(min(batch_size, count - offset))
+                ]
+                Product.objects.bulk_create(batch)
+                index_products(batch)
+                seeded_ids.extend(product.pk for product in batch)
+        return seeded_ids
+
+    def time_queries(self, queries, run):
+        timings = []
+        for query in queries:
+            start_time = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - start_time) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:>16}: mean {statistics.mean(timings):.2f} ms, '
+            f'p50 {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms'
+        )
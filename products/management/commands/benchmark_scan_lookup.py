@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from products.models import Category, Product
+from products.scan_index import ProductScanIndex
+from products.search import remove_products
+import random
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = 'Benchmark barcode/SKU scan lookups against the in-memory index and the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create this many temporary products before benchmarking (e.g. 100000)',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=20000,
+            help='Number of scans to time (default: 20000)',
+        )
+
+    def handle(self, *args, **options):
+        seeded_ids = self.seed_products(options['seed']) if options['seed'] else []
+
+        try:
+            start_time = time.perf_counter()
+            indexed = ProductScanIndex.warm()
+            warm_seconds = time.perf_counter() - start_time
+            if not indexed:
+                raise CommandError('No active products to look up. Use --seed.')
+
+            codes = [
+                barcode or sku
+                for sku, barcode in Product.objects.filter(is_active=True).values_list('sku', 'barcode')[:50000]
+            ]
+            scans = [random.choice(codes) for _ in range(options['lookups'])]
+
+            index_times = []
+            for code in scans:
+                start_time = time.perf_counter()
+                ProductScanIndex.lookup(code)
+                index_times.append((time.perf_counter() - start_time) * 1e6)
+
+            db_times = []
+            for code in scans[:1000]:
+                start_time = time.perf_counter()
+                Product.objects.filter(
+                    Q(sku=code.upper()) | Q(barcode=code), is_active=True
+                ).values_list(*ProductScanIndex.FIELDS).first()
+                db_times.append((time.perf_counter() - start_time) * 1e6)
+
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 SCAN LOOKUP BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Indexed products: {indexed} (warmed in {warm_seconds:.2f} seconds)')
+            self.report('in-memory index', index_times)
+            self.report('database lookup', db_times)
+        finally:
+            ProductScanIndex.clear()
+            if seeded_ids:
+                Product.objects.filter(pk__in=seeded_ids).delete()
+                remove_products(seeded_ids)
+
+    def seed_products(self, count):
+        self.stdout.write(f'🌱 Seeding {count} temporary products...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        seeded_ids = []
+        batch_size = 5000
+        with transaction.atomic():
+            for offset in range(0, count, batch_size):
+                batch = [
+                    Product(
+                        id=uuid.uuid4(),
+                        name=f'Scan benchmark {offset + i}',
+                        sku=f'SC-{uuid.uuid4().hex[:10].upper()}',
+                        barcode=f'{6000000000000 + offset + i}',
+                        category=category,
+                        unit_price=1,
+                    )
+                    for i in range(min(batch_size, count - offset))
+                ]
+                Product.objects.bulk_create(batch)
+                seeded_ids.extend(product.pk for product in batch)
+        return seeded_ids
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p50 = timings[len(timings) // 2]
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(f'{label:>16}: p50 {p50:.1f} µs, p99 {p99:.1f} µs ({len(timings)} lookups)')
@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from products.models import Category, Product
+import random
+import statistics
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = 'Benchmark low-stock queries on the indexed stock_status column against column comparisons'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=500000,
+            help='Temporary products to create for the run (default: 500000, 0 to use existing data)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Times to run each query (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back, so seeded rows never persist
+        with transaction.atomic():
+            if options['seed']:
+                self.seed_products(options['seed'])
+
+            active = Product.objects.filter(is_active=True)
+            cases = [
+                (
+                    'dashboard low-stock count',
+                    lambda: active.filter(stock_quantity__lte=F('minimum_stock')).count(),
+                    lambda: active.filter(stock_status__in=Product.LOW_STOCK_STATUSES).count(),
+                ),
+                (
+                    'low_stock_api (10 rows)',
+                    lambda: list(active.filter(stock_quantity__lte=F('minimum_stock'))[:10]),
+                    lambda: list(active.filter(stock_status__in=Product.LOW_STOCK_STATUSES)[:10]),
+                ),
+                (
+                    'product list ?stock_status=low',
+                    lambda: list(active.filter(
+                        stock_quantity__gt=0, stock_quantity__lte=F('minimum_stock')
+                    ).order_by('name', 'id')[:20]),
+                    lambda: list(active.filter(stock_status='low').order_by('name', 'id')[:20]),
+                ),
+                (
+                    'reorder alert scan',
+                    lambda: list(active.filter(
+                        stock_quantity__lte=F('reorder_level')
+                    ).values_list('id', flat=True)),
+                    lambda: list(active.filter(
+                        stock_status__in=Product.REORDER_STATUSES
+                    ).values_list('id', flat=True)),
+                ),
+            ]
+
+            self.stdout.write('\n' + '='*50)
+            self.stdout.write(self.style.SUCCESS('📊 STOCK STATUS BENCHMARK'))
+            self.stdout.write('='*50)
+            self.stdout.write(f'Active products: {active.count()}')
+            for label, legacy, indexed in cases:
+                legacy_ms = self.time_query(legacy, options['repeat'])
+                indexed_ms = self.time_query(indexed, options['repeat'])
+                self.stdout.write(
+                    f'{label:>32}: {legacy_ms:8.2f} ms -> {indexed_ms:7.2f} ms '
+                    f'({legacy_ms / max(indexed_ms, 1e-9):.1f}x)'
+                )
+
+            transaction.set_rollback(True)
+
+    def seed_products(self, count):
+        self.stdout.write(f'🌱 Seeding {count} temporary products...')
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark',
+            defaults={'description': 'Created by benchmark commands', 'is_active': False}
+        )
+        batch_size = 5000
+        for offset in range(0, count, batch_size):
+            batch = []
+            for i in range(min(batch_size, count - offset)):
+                # Roughly 95% healthy, 3% at reorder level, 1.5% low and 0.5% out of stock
+                roll = random.random()
+                if roll < 0.005:
+                    stock = 0
+                elif roll < 0.02:
+                    stock = random.randint(1, 10)
+                elif roll < 0.05:
+                    stock = random.randint(11, 20)
+                else:
+                    stock = random.randint(21, 1000)
+                batch.append(Product(
+                    id=uuid.uuid4(),
+                    name=f'Status benchmark {offset + i}',
+                    sku=f'ST-{uuid.uuid4().hex[:12].upper()}',
+                    category=category,
+                    unit_price=1,
+                    stock_quantity=stock,
+                    minimum_stock=10,
+                    reorder_level=20,
+                ))
+            Product.objects.bulk_create(batch)
+
+    def time_query(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start_time) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory_plus.thumbnails import _setup_worker, generate_variants, pending_sources
+import os
+import time
+
+
+def image_sources():
+    """(label, queryset of stored image names) for every model whose images are shown as thumbnails"""
+    from products.models import Category, Product
+
+    return [
+        ('products', Product.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)),
+        ('categories', Category.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Thumbnail worker: generate list/card/detail thumbnails for product and category images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even when a manifest already exists',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep polling for new images instead of exiting after one pass',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30,
+            help='Seconds between polls with --watch (default: 30)',
+        )
+
+    def collect(self, force, verbose):
+        names = []
+        for label, queryset in image_sources():
+            found = list(queryset.distinct())
+            if verbose:
+                self.stdout.write(f'🖼️  {label}: {len(found)} images')
+            names.extend(found)
+        names = list(dict.fromkeys(names))
+        return len(names), names if force else pending_sources(names)
+
+    def generate(self, executor, names, force):
+        generated = failed = 0
+        futures = {executor.submit(generate_variants, name, force): name for name in names}
+        for future in as_completed(futures):
+            try:
+                if future.result() is not None:
+                    generated += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'❌ {futures[future]}: {e}'))
+        return generated, failed
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_setup_worker) as executor:
+            if options['watch']:
+                self.watch(executor, options['interval'])
+                return
+
+            start_time = time.perf_counter()
+            total, names = self.collect(options['force'], verbose=True)
+            generated, failed = self.generate(executor, names, options['force'])
+            elapsed = time.perf_counter() - start_time
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 THUMBNAIL SUMMARY'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Generated: {generated}')
+        self.stdout.write(f'Already up to date: {total - generated - failed}')
+        self.stdout.write(f'Failed: {failed}')
+        self.stdout.write(f'Time: {elapsed:.2f} seconds with {options["workers"]} workers')
+
+    def watch(self, executor, interval):
+        self.stdout.write(self.style.SUCCESS('🖼️  Thumbnail worker started'))
+        try:
+            while True:
+                generated, failed = self.generate(executor, self.collect(False, verbose=False)[1], False)
+                if generated or failed:
+                    stamp = timezone.localtime().strftime('%H:%M:%S')
+                    self.stdout.write(f'[{stamp}] 🖼️  Generated {generated}, failed {failed}')
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Thumbnail worker stopped'))
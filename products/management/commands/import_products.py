@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import ImportFormatError, ProductImporter, iter_rows
+import os
+
+
+class Command(BaseCommand):
+    help = 'Import or update products from a CSV or XLSX catalog file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .xlsx file')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows validated and upserted per chunk (default: 1000)',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Where to write rejected rows (default: <path>.errors.csv)',
+        )
+        parser.add_argument(
+            '--user',
+            help='Username recorded as creator/updater of imported products',
+        )
+        parser.add_argument(
+            '--no-create-categories',
+            action='store_true',
+            help='Reject rows whose category does not exist instead of creating it',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" does not exist')
+
+        errors_path = options['errors'] or f'{path}.errors.csv'
+        self.stdout.write(f'📦 Importing products from {path}...')
+
+        with open(path, 'rb') as stream, open(errors_path, 'w', newline='', encoding='utf-8') as error_stream:
+            importer = ProductImporter(
+                user=user,
+                batch_size=options['batch_size'],
+                create_categories=not options['no_create_categories'],
+                error_stream=error_stream,
+            )
+            try:
+                stats = importer.run(iter_rows(stream, path))
+            except ImportFormatError as e:
+                raise CommandError(str(e))
+
+        if not stats['failed']:
+            os.remove(errors_path)
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS('📊 PRODUCT IMPORT SUMMARY'))
+        self.stdout.write('='*50)
+        self.stdout.write(f'Rows read: {stats["rows"]}')
+        self.stdout.write(f'Created: {stats["created"]}')
+        self.stdout.write(f'Updated: {stats["updated"]}')
+        self.stdout.write(f'Rejected: {stats["failed"]}')
+        self.stdout.write(f'Time: {stats["seconds"]:.2f} seconds ({stats["rows_per_second"]} rows/sec)')
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(f'⚠️  Rejected rows written to {errors_path}'))
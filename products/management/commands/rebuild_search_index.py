@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Products indexed per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(
+                self.style.WARNING('The FTS5 search index is only available on SQLite; nothing to do.')
+            )
+            return
+
+        self.stdout.write('🔍 Rebuilding product search index...')
+        start_time = timezone.now()
+
+        indexed = rebuild_index(batch_size=options['batch_size'])
+
+        duration = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Indexed {indexed} products in {duration:.2f} seconds')
+        )
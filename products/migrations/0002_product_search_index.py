@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+SEARCH_FIELDS = ('name', 'sku', 'barcode', 'brand', 'model_number')
+
+
+def create_search_index(apps, schema_editor):
+    """Create and populate the FTS5 product search table (SQLite only)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Product = apps.get_model('products', 'Product')
+    columns = ', '.join(SEARCH_FIELDS)
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5("
+        f"product_id UNINDEXED, {columns}, tokenize='trigram')"
+    )
+
+    rows = [
+        (product.pk.int >> 65, product.pk.hex, *[getattr(product, field) or '' for field in SEARCH_FIELDS])
+        for product in Product.objects.only('id', *SEARCH_FIELDS).iterator()
+    ]
+    if rows:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO products_product_fts (rowid, product_id, {columns}) "
+                f"VALUES ({', '.join(['%s'] * (len(SEARCH_FIELDS) + 2))})",
+                rows
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS products_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_remove_product_products_pr_name_9ff0a3_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_status',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(stock_quantity__lte=0, then=models.Value('out')), models.When(stock_quantity__lte=models.F('minimum_stock'), then=models.Value('low')), models.When(stock_quantity__lte=models.F('reorder_level'), then=models.Value('reorder')), default=models.Value('ok')), help_text='Computed by the database from stock, minimum and reorder levels', output_field=models.CharField(choices=[('ok', 'OK'), ('reorder', 'Reorder'), ('low', 'Low'), ('out', 'Out')], max_length=10)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['stock_status', 'name', 'id'], name='products_active_status_idx'),
+        ),
+    ]
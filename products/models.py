@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
@@ -29,8 +31,20 @@ class Category(models.Model):
         return reverse('products:category_detail', kwargs={'pk': self.pk})
 
     def get_products_count(self):
+        # Prefer the count annotated by with_products_count() to avoid a query per row
+        if hasattr(self, 'products_count'):
+            return self.products_count
         return self.products.filter(is_active=True).count()
 
+    @staticmethod
+    def with_products_count(queryset=None):
+        """Annotate categories with their active product count in a single query"""
+        if queryset is None:
+            queryset = Category.objects.all()
+        return queryset.annotate(
+            products_count=models.Count('products', filter=models.Q(products__is_active=True))
+        )
+
 
 class Product(models.Model):
     """Product model for inventory items"""
@@ -45,6 +59,17 @@ class Product(models.Model):
         ('set', 'Sets'),
     ]
 
+    STOCK_STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('reorder', 'Reorder'),
+        ('low', 'Low'),
+        ('out', 'Out'),
+    ]
+    
+    # Statuses at or below minimum_stock / at or below reorder_level
+    LOW_STOCK_STATUSES = ('low', 'out')
+    REORDER_STATUSES = ('reorder', 'low', 'out')
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200)
     sku = models.CharField(max_length=50, unique=True, help_text="Stock Keeping Unit")
@@ -58,11 +83,33 @@ class Product(models.Model):
     selling_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     unit = models.CharField(max_length=10, choices=UNIT_CHOICES, default='pcs')
     
+    # Fields served by the stock feed; saving any of them stamps updated_at
+    CHANGE_TRACKED_FIELDS = (
+        'name', 'sku', 'stock_quantity', 'minimum_stock', 'maximum_stock', 'reorder_level', 'is_active'
+    )
+
+    # updated_at is stamped before commit, so a write stamped earlier can
+    # become visible after a later one. Change readers (the stock delta feed,
+    # scan indexes) re-read this much history to catch such late commits and
+    # clock skew between app servers.
+    CHANGE_SETTLE_TIME = timedelta(seconds=30)
+    
     # Stock Management
     stock_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     minimum_stock = models.IntegerField(default=10, validators=[MinValueValidator(0)])
     maximum_stock = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(0)])
     reorder_level = models.IntegerField(default=20, validators=[MinValueValidator(0)])
+    stock_status = models.GeneratedField(
+        expression=models.Case(
+            models.When(stock_quantity__lte=0, then=models.Value('out')),
+            models.When(stock_quantity__lte=models.F('minimum_stock'), then=models.Value('low')),
+            models.When(stock_quantity__lte=models.F('reorder_level'), then=models.Value('reorder')),
+            default=models.Value('ok'),
+        ),
+        output_field=models.CharField(max_length=10, choices=STOCK_STATUS_CHOICES),
+        db_persist=True,
+        help_text="Computed by the database from stock, minimum and reorder levels",
+    )
     
     # Product Details
     weight = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
@@ -99,8 +146,14 @@ class Product(models.Model):
         ordering = ['name']
         indexes = [
             models.Index(fields=['sku']),
-            models.Index(fields=['name']),
+            models.Index(fields=['name', 'id']),
             models.Index(fields=['category']),
+            models.Index(
+                fields=['stock_status', 'name', 'id'],
+                condition=models.Q(is_active=True),
+                name='products_active_status_idx',
+            ),
+            models.Index(fields=['updated_at', 'id'], name='products_updated_at_idx'),
         ]
 
     def __str__(self):
@@ -148,25 +201,10 @@ class Product(models.Model):
         """Get formatted stock value with SAR currency"""
         return f"{self.stock_value:.2f} SAR"
 
-    @property
-    def stock_status(self):
-        """Get stock status as string"""
-        if self.is_out_of_stock:
-            return 'out'
-        elif self.is_low_stock:
-            return 'low'
-        else:
-            return 'high'
-
     @property
     def stock_status_display(self):
         """Get human readable stock status"""
-        status_map = {
-            'out': 'Out',
-            'low': 'Low',
-            'high': 'High'
-        }
-        return status_map.get(self.stock_status, 'Unknown')
+        return dict(self.STOCK_STATUS_CHOICES).get(self.stock_status, 'Unknown')
 
     def get_suppliers(self):
         """Get all suppliers for this product"""
@@ -197,4 +235,49 @@ class Product(models.Model):
         """Override save to ensure SKU is uppercase"""
         if self.sku:
             self.sku = self.sku.upper()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CHANGE_TRACKED_FIELDS):
+            # auto_now is only written when listed, and the stock feed reads updated_at
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
+
+class ProductSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 search index, mapped so searches can join it.
+
+    The virtual table is created and kept in sync by products/search.py,
+    never by the ORM. ``document`` is FTS5's hidden column named after the
+    table, the left-hand side of MATCH and the argument of bm25().
+    """
+    rowid = models.BigIntegerField(primary_key=True)
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, db_column='product_id', db_constraint=False,
+        related_name='search_entry'
+    )
+    document = models.TextField(db_column='products_product_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'products_product_fts'
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search index in sync with product changes"""
+    if raw:
+        return
+    from .search import index_products
+    from .scan_index import ProductScanIndex
+    index_products([instance])
+    ProductScanIndex.invalidate_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_search_index(sender, instance, **kwargs):
+    """Drop deleted products from the full-text search index"""
+    from .search import remove_products
+    from .scan_index import ProductScanIndex
+    remove_products([instance.pk])
+    ProductScanIndex.invalidate_on_commit([instance.pk])
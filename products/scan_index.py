@@ -0,0 +1,204 @@
+"""
+In-process exact-match index of barcodes and SKUs for handheld scanners
+"""
+from django.db import transaction
+from django.db.models import Max, Q
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProductScanIndex:
+    """
+    Hash index of barcode/SKU -> (id, name, sku, stock_quantity, unit_price).
+
+    The index lives in each worker process. Writes made by this process drop
+    their entries on commit. Writes made anywhere else (other workers,
+    management commands, the importer) are picked up by refresh(): at most
+    every REFRESH_INTERVAL seconds a lookup re-reads the products whose
+    updated_at is within Product.CHANGE_SETTLE_TIME of the newest change
+    already loaded, an indexed range scan. Hard-deleted products are dropped
+    by the full reload every FULL_RELOAD_INTERVAL seconds.
+
+    The first lookup starts loading the catalogue in a background thread and
+    is answered from the database until the load has finished.
+    """
+
+    REFRESH_INTERVAL = 2
+    FULL_RELOAD_INTERVAL = 600
+
+    _lock = threading.Lock()
+    _by_code = {}
+    _codes_by_id = {}
+    _warm = False
+    _warming = False
+    # Newest updated_at loaded, and when the index was last loaded or refreshed
+    _watermark = None
+    _loaded_at = 0.0
+    _refreshed_at = 0.0
+    # Bumped whenever entries are dropped or replaced, so a lookup that missed
+    # never stores a row read before that happened
+    _generation = 0
+
+    FIELDS = ('id', 'sku', 'barcode', 'name', 'stock_quantity', 'unit_price')
+
+    @classmethod
+    def _entry(cls, row):
+        product_id, sku, barcode, name, stock_quantity, unit_price = row
+        return {
+            'id': str(product_id),
+            'name': name,
+            'sku': sku,
+            'barcode': barcode,
+            'stock_quantity': stock_quantity,
+            'unit_price': str(unit_price),
+        }
+
+    @staticmethod
+    def _store(entry, by_code, codes_by_id):
+        codes = [entry['sku']]
+        if entry['barcode']:
+            codes.append(entry['barcode'])
+        for code in codes:
+            by_code[code] = entry
+        codes_by_id[entry['id']] = codes
+
+    @classmethod
+    def _drop(cls, product_id):
+        for code in cls._codes_by_id.pop(str(product_id), ()):
+            cls._by_code.pop(code, None)
+
+    @classmethod
+    def warm(cls):
+        """Load every active product into the index"""
+        from .models import Product
+
+        by_code = {}
+        codes_by_id = {}
+        watermark = None
+        rows = Product.objects.filter(is_active=True).values_list(*cls.FIELDS, 'updated_at').iterator(
+            chunk_size=5000
+        )
+        for *row, updated_at in rows:
+            cls._store(cls._entry(row), by_code, codes_by_id)
+            watermark = updated_at if watermark is None else max(watermark, updated_at)
+        if watermark is None:
+            watermark = Product.objects.aggregate(latest=Max('updated_at'))['latest']
+
+        with cls._lock:
+            cls._by_code = by_code
+            cls._codes_by_id = codes_by_id
+            # Writes that committed during the read are within the settle window
+            cls._watermark = watermark
+            cls._loaded_at = cls._refreshed_at = time.monotonic()
+            cls._generation += 1
+            cls._warm = True
+        return len(codes_by_id)
+
+    @classmethod
+    def refresh(cls):
+        """Reload the products changed since the newest change already loaded"""
+        from .models import Product
+
+        changed = Product.objects.values_list(*cls.FIELDS, 'is_active', 'updated_at')
+        if cls._watermark is not None:
+            changed = changed.filter(updated_at__gte=cls._watermark - Product.CHANGE_SETTLE_TIME)
+        rows = list(changed)
+
+        with cls._lock:
+            for *row, is_active, updated_at in rows:
+                cls._drop(row[0])
+                if is_active:
+                    cls._store(cls._entry(row), cls._by_code, cls._codes_by_id)
+                if cls._watermark is None or updated_at > cls._watermark:
+                    cls._watermark = updated_at
+            cls._refreshed_at = time.monotonic()
+            cls._generation += 1
+        return len(rows)
+
+    @classmethod
+    def _warm_in_background(cls):
+        with cls._lock:
+            if cls._warming:
+                return
+            cls._warming = True
+        threading.Thread(target=cls._background_warm, name='scan-index-warm', daemon=True).start()
+
+    @classmethod
+    def _background_warm(cls):
+        from django.db import connection
+        try:
+            cls.warm()
+        except Exception:
+            logger.exception('Loading the scan index failed')
+        finally:
+            cls._warming = False
+            connection.close()
+
+    @classmethod
+    def _ensure_fresh(cls):
+        """Start or schedule a full load when due, else refresh when due; True when the index can answer"""
+        if not cls._warm:
+            cls._warm_in_background()
+            return False
+        now = time.monotonic()
+        if now - cls._loaded_at >= cls.FULL_RELOAD_INTERVAL:
+            cls._warm_in_background()
+        if now - cls._refreshed_at >= cls.REFRESH_INTERVAL:
+            cls.refresh()
+        return True
+
+    @classmethod
+    def lookup(cls, code):
+        """Resolve a scanned barcode or SKU, or return None"""
+        from .models import Product
+
+        code = (code or '').strip()
+        if not code:
+            return None
+
+        if cls._ensure_fresh():
+            entry = cls._by_code.get(code) or cls._by_code.get(code.upper())
+            if entry is not None:
+                return entry
+
+        # Miss: fall back to the unique-indexed columns and remember the result
+        generation = cls._generation
+        row = Product.objects.filter(
+            Q(sku=code.upper()) | Q(barcode=code),
+            is_active=True
+        ).values_list(*cls.FIELDS).first()
+        if row is None:
+            return None
+
+        entry = cls._entry(row)
+        with cls._lock:
+            # The row may predate an invalidation or refresh that ran meanwhile
+            if cls._warm and cls._generation == generation:
+                cls._store(entry, cls._by_code, cls._codes_by_id)
+        return entry
+
+    @classmethod
+    def invalidate(cls, product_ids):
+        """Drop the entries for the given products"""
+        with cls._lock:
+            for product_id in product_ids:
+                cls._drop(product_id)
+            cls._generation += 1
+
+    @classmethod
+    def invalidate_on_commit(cls, product_ids):
+        """Drop the entries once the surrounding transaction has committed"""
+        product_ids = list(product_ids)
+        transaction.on_commit(lambda: cls.invalidate(product_ids))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._by_code = {}
+            cls._codes_by_id = {}
+            cls._watermark = None
+            cls._generation += 1
+            cls._warm = False
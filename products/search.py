@@ -0,0 +1,163 @@
+"""
+Full-text product search backed by an SQLite FTS5 index (trigram tokenizer)
+"""
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.lookups import Lookup
+import uuid
+
+
+SEARCH_TABLE = 'products_product_fts'
+SEARCH_FIELDS = ('name', 'sku', 'barcode', 'brand', 'model_number')
+
+# bm25 weights, in column order: product_id (unindexed), then SEARCH_FIELDS
+SEARCH_WEIGHTS = (0.0, 10.0, 8.0, 8.0, 2.0, 2.0)
+
+# The trigram tokenizer cannot match anything shorter than three characters
+MIN_QUERY_LENGTH = 3
+
+
+def is_index_available():
+    """
+    Check whether the FTS5 index exists on the current database.
+
+    Looked up on every call (one sqlite_master read) so a migration or
+    rebuild in another process is picked up straight away.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        return cursor.fetchone() is not None
+
+
+def create_index():
+    """Create the FTS5 table if it does not exist yet"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"product_id UNINDEXED, {', '.join(SEARCH_FIELDS)}, tokenize='trigram')"
+        )
+
+
+def _rowid(pk):
+    """Stable 63-bit rowid derived from the product UUID"""
+    if not isinstance(pk, uuid.UUID):
+        pk = uuid.UUID(str(pk))
+    return pk.int >> 65
+
+
+def index_products(products):
+    """Insert or refresh index rows for the given products"""
+    if not is_index_available():
+        return
+    rows = [
+        (_rowid(product.pk), product.pk.hex, *[getattr(product, field) or '' for field in SEARCH_FIELDS])
+        for product in products
+    ]
+    if not rows:
+        return
+    placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 2))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, product_id, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES ({placeholders})",
+            rows
+        )
+
+
+def remove_products(pks):
+    """Remove index rows for the given product ids"""
+    if not is_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+            [(_rowid(pk),) for pk in pks]
+        )
+
+
+def rebuild_index(batch_size=2000):
+    """Drop and repopulate the whole index from products_product"""
+    from .models import Product
+
+    if connection.vendor != 'sqlite':
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    create_index()
+
+    indexed = 0
+    batch = []
+    for product in Product.objects.only('id', *SEARCH_FIELDS).iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            index_products(batch)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        index_products(batch)
+        indexed += len(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+    return indexed
+
+
+def _match_phrase(query):
+    """Quote the query as a single FTS5 phrase so user input is never parsed as syntax"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+class Match(Lookup):
+    """``document MATCH query`` on the joined ProductSearchEntry"""
+
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def _rank_expression(document):
+    """bm25() relevance of the matched index row; lower is better"""
+    return Func(document, *[Value(weight) for weight in SEARCH_WEIGHTS], function='bm25', output_field=FloatField())
+
+
+def substring_filter(query):
+    """The plain icontains filter used when the index cannot serve a query"""
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return condition
+
+
+def search_products(queryset, query):
+    """
+    Filter a Product queryset by a search query, ordered by relevance.
+
+    The FTS5 table is joined through ProductSearchEntry, so SQLite drives
+    the query from the index match instead of scanning products_product,
+    and ranks each row with bm25() on the same index cursor. The rank is an
+    alias, so callers that clear the ordering (facet counts) skip it. Falls
+    back to icontains filtering when the index is unavailable or the query
+    is too short for the trigram tokenizer.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if len(query) < MIN_QUERY_LENGTH or not is_index_available():
+        return queryset.filter(substring_filter(query))
+
+    document = F('search_entry__document')
+    # The isnull filter makes the join an INNER one, which SQLite can drive from the MATCH
+    return queryset.filter(Match(document, _match_phrase(query)), search_entry__isnull=False).alias(
+        search_rank=_rank_expression(document)
+    ).order_by('search_rank', 'pk')
@@ -7,6 +7,8 @@ urlpatterns = [
     # Product URLs
     path('', views.ProductListView.as_view(), name='product_list'),
     path('add/', views.ProductCreateView.as_view(), name='product_add'),
+    path('import/', views.product_import_view, name='product_import'),
+    path('import/errors/<uuid:token>/', views.product_import_errors, name='product_import_errors'),
     path('<uuid:pk>/', views.ProductDetailView.as_view(), name='product_detail'),
     path('<uuid:pk>/edit/', views.ProductUpdateView.as_view(), name='product_edit'),
     path('<uuid:pk>/delete/', views.ProductDeleteView.as_view(), name='product_delete'),
@@ -21,6 +23,9 @@ urlpatterns = [
 
     # API endpoints
     path('api/search/', views.product_search_api, name='api_product_search'),
+    path('api/scan/', views.scan_lookup_api, name='api_scan_lookup'),
+    path('api/facets/', views.product_facets_api, name='api_product_facets'),
     path('api/low-stock/', views.low_stock_api, name='api_low_stock'),
+    path('api/<uuid:pk>/movements/', views.product_movements_api, name='api_product_movements'),
     path('api/<uuid:pk>/delete/', views.delete_product_ajax, name='api_delete_product'),
 ]
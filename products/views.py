@@ -2,55 +2,57 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, F
+from django.db.models import Q
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import Product, Category
 from .forms import CategoryForm, ProductForm
+from .facets import apply_filters, facet_counts, facet_links, filter_querystring, normalize_filters
+from .search import search_products
+from .scan_index import ProductScanIndex
+from inventory_plus.pagination import KeysetPaginationMixin
 
 
-class ProductListView(LoginRequiredMixin, ListView):
+class ProductListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'products/product_list.html'
     context_object_name = 'products'
     paginate_by = 20
+    keyset_ordering = ('name', 'id')
+    
+    def use_keyset_pagination(self):
+        # Search results are ordered by relevance, not by name
+        return not self.request.GET.get('query') and super().use_keyset_pagination()
     
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('category')
-        
-        # Search by name or SKU
-        query = self.request.GET.get('query')
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | Q(sku__icontains=query)
-            )
-        
-        # Filter by category
-        category = self.request.GET.get('category')
-        if category:
-            queryset = queryset.filter(category_id=category)
-        
-        # Filter by stock status
-        stock_status = self.request.GET.get('stock_status')
-        if stock_status == 'high':
-            queryset = queryset.filter(stock_quantity__gt=F('minimum_stock'))
-        elif stock_status == 'low':
-            queryset = queryset.filter(
-                stock_quantity__gt=0,
-                stock_quantity__lte=F('minimum_stock')
-            )
-        elif stock_status == 'out':
-            queryset = queryset.filter(stock_quantity=0)
-        
-        return queryset
+        # Search by name, SKU, barcode, brand or model number (ranked), then
+        # narrow by category, stock status, brand and supplier
+        self.filters = normalize_filters(self.request.GET)
+        return apply_filters(
+            Product.objects.filter(is_active=True).select_related('category', 'forecast'),
+            self.filters
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        facets = facet_counts(self.filters)
+        category_counts = {item['value']: item['count'] for item in facets['category']}
+        categories = list(Category.with_products_count())
+        for category in categories:
+            category.facet_count = category_counts.get(str(category.id), 0)
+        context['categories'] = categories
+        context['facets'] = facet_links(facets, self.filters)
+        context['facet_total'] = facets['total']
+        context['stock_status_counts'] = {item['value']: item['count'] for item in facets['stock_status']}
+        context['filters'] = self.filters
+        context['filter_query'] = filter_querystring(self.filters)
+        context['clear_filter_urls'] = {
+            key: '?' + filter_querystring(self.filters, **{key: None}) for key in self.filters
+        }
         return context
 
 
@@ -58,6 +60,70 @@ class ProductDetailView(LoginRequiredMixin, DetailView):
     model = Product
     template_name = 'products/product_detail.html'
     context_object_name = 'product'
+    movements_per_page = 10
+    notifications_shown = 5
+    
+    def get_queryset(self):
+        from django.db.models import Prefetch
+        from inventory.models import StockMovement
+        from notifications.models import Notification
+        from suppliers.models import SupplierProduct
+        
+        # One query per relation, each capped per product where it can grow without bound
+        return Product.objects.select_related('category').prefetch_related(
+            Prefetch(
+                'supplierproduct_set',
+                queryset=SupplierProduct.objects.filter(
+                    supplier__is_active=True
+                ).select_related('supplier').order_by('supplier__name'),
+                to_attr='supplier_links',
+            ),
+            Prefetch(
+                'stock_movements',
+                queryset=StockMovement.objects.select_related('created_by').order_by(
+                    '-created_at', '-id'
+                )[:self.movements_per_page + 1],
+                to_attr='latest_movements',
+            ),
+            Prefetch(
+                'notifications',
+                queryset=Notification.objects.order_by('-created_at')[:self.notifications_shown],
+                to_attr='recent_notifications',
+            ),
+        )
+    
+    def get_context_data(self, **kwargs):
+        from django.db.models import Max, Sum
+        from django.utils import timezone
+        from datetime import timedelta
+        from inventory.models import StockMovement
+        from inventory.services import StockLedgerService
+        from inventory_plus.pagination import KeysetPaginator
+        
+        context = super().get_context_data(**kwargs)
+        product = self.object
+        
+        since = timezone.now() - timedelta(days=30)
+        context['movement_stats'] = StockMovement.objects.filter(product=product).aggregate(
+            total_in_30d=Sum('quantity', filter=Q(
+                movement_type__in=StockLedgerService.INBOUND_TYPES, created_at__gte=since
+            )),
+            total_out_30d=Sum('quantity', filter=Q(
+                movement_type__in=StockLedgerService.OUTBOUND_TYPES, created_at__gte=since
+            )),
+            last_movement_at=Max('created_at'),
+        )
+        
+        movements = product.latest_movements
+        context['recent_movements'] = movements[:self.movements_per_page]
+        context['movements_cursor'] = None
+        if len(movements) > self.movements_per_page:
+            paginator = KeysetPaginator(StockMovement.objects.filter(product=product), ('-created_at', '-id'))
+            context['movements_cursor'] = paginator.encode_cursor(movements[self.movements_per_page - 1], 'next')
+        
+        context['suppliers'] = [link.supplier for link in product.supplier_links]
+        context['recent_notifications'] = product.recent_notifications
+        return context
 
 
 class ProductCreateView(LoginRequiredMixin, CreateView):
@@ -115,7 +181,7 @@ class CategoryListView(LoginRequiredMixin, ListView):
     context_object_name = 'categories'
     
     def get_queryset(self):
-        return Category.objects.filter(is_active=True)
+        return Category.with_products_count(Category.objects.filter(is_active=True))
 
 
 class CategoryDetailView(LoginRequiredMixin, DetailView):
@@ -152,6 +218,60 @@ class CategoryDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('products:category_list')
 
 
+@login_required
+def product_import_view(request):
+    """Upload a CSV/XLSX catalog and upsert its products"""
+    from django.core.files import File
+    from .importer import ImportFormatError, ProductImporter, error_file_storage, iter_rows
+    import tempfile
+    import uuid
+    
+    context = {}
+    
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Choose a .csv or .xlsx file to import.')
+        else:
+            with tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8') as error_stream:
+                importer = ProductImporter(user=request.user, error_stream=error_stream)
+                try:
+                    stats = importer.run(iter_rows(upload.file, upload.name))
+                except ImportFormatError as e:
+                    messages.error(request, str(e))
+                    stats = None
+                
+                if stats:
+                    context.update({'stats': stats, 'errors': importer.errors})
+                    messages.success(
+                        request,
+                        f'Imported {stats["created"] + stats["updated"]} products '
+                        f'({stats["created"]} new, {stats["updated"]} updated) '
+                        f'at {stats["rows_per_second"]} rows/sec.'
+                    )
+                    if stats['failed']:
+                        error_stream.seek(0)
+                        token = uuid.uuid4()
+                        error_file_storage().save(f'{request.user.pk}/{token.hex}.csv', File(error_stream))
+                        context['errors_url'] = reverse('products:product_import_errors', kwargs={'token': token})
+                        messages.warning(request, f'{stats["failed"]} rows were rejected.')
+    
+    return render(request, 'products/product_import.html', context)
+
+
+@login_required
+def product_import_errors(request, token):
+    """Download the rejected rows of one of the current user's imports"""
+    from django.http import FileResponse, Http404
+    from .importer import error_file_storage
+    
+    storage = error_file_storage()
+    name = f'{request.user.pk}/{token.hex}.csv'
+    if not storage.exists(name):
+        raise Http404('Error file not found')
+    return FileResponse(storage.open(name, 'rb'), as_attachment=True, filename='rejected-rows.csv')
+
+
 # API Views
 @login_required
 def product_search_api(request):
@@ -159,10 +279,7 @@ def product_search_api(request):
     if len(query) < 2:
         return JsonResponse({'products': []})
     
-    products = Product.objects.filter(
-        Q(name__icontains=query) | Q(sku__icontains=query) | Q(barcode__icontains=query),
-        is_active=True
-    )[:10]
+    products = search_products(Product.objects.filter(is_active=True), query)[:10]
     
     data = {
         'products': [
@@ -180,12 +297,64 @@ def product_search_api(request):
     return JsonResponse(data)
 
 
+@login_required
+def scan_lookup_api(request):
+    """Exact barcode/SKU lookup for handheld scanners"""
+    code = request.GET.get('code', '')
+    product = ProductScanIndex.lookup(code)
+    
+    if product is None:
+        return JsonResponse({'found': False, 'code': code}, status=404)
+    
+    return JsonResponse({'found': True, 'product': product})
+
+
+@login_required
+def product_movements_api(request, pk):
+    """Older stock movements for the detail page's "load more" button"""
+    from inventory.models import StockMovement
+    from inventory_plus.pagination import InvalidCursor, KeysetPaginator
+    
+    queryset = StockMovement.objects.filter(product_id=pk).select_related('created_by')
+    paginator = KeysetPaginator(queryset, ('-created_at', '-id'), ProductDetailView.movements_per_page)
+    try:
+        page = paginator.page(request.GET.get('cursor') or None)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'movements': [
+            {
+                'id': str(movement.id),
+                'created_at': movement.created_at.isoformat(),
+                'movement_type': movement.movement_type,
+                'movement_type_display': movement.get_movement_type_display(),
+                'quantity': movement.quantity,
+                'previous_stock': movement.previous_stock,
+                'new_stock': movement.new_stock,
+                'created_by': (
+                    movement.created_by.get_full_name() or movement.created_by.username
+                ) if movement.created_by else None,
+            }
+            for movement in page
+        ],
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+def product_facets_api(request):
+    """Facet counts for the product list filters in the query string"""
+    return JsonResponse(facet_counts(normalize_filters(request.GET)))
+
+
 @login_required
 def low_stock_api(request):
+    from inventory.forecasting import reorder_suggestion
     products = Product.objects.filter(
         is_active=True,
-        stock_quantity__lte=F('minimum_stock')
-    ).select_related('category')[:10]
+        stock_status__in=Product.LOW_STOCK_STATUSES
+    ).select_related('category', 'forecast')[:10]
     
     data = {
         'products': [
@@ -196,6 +365,7 @@ def low_stock_api(request):
                 'stock_quantity': product.stock_quantity,
                 'minimum_stock': product.minimum_stock,
                 'category': product.category.name,
+                **reorder_suggestion(product),
             }
             for product in products
         ]